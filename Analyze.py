@@ -0,0 +1,55 @@
+import argparse
+import multiprocessing
+import time
+
+import libs.Analytics as analytics
+import Sweep
+
+def analyze_run(job):
+	# the metrics of a run, or its error
+	outdir, chunk_rows = job
+	return dict({'run': outdir}, **Sweep.guarded(analytics.analyze, outdir, chunk_rows))
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Compare the results of simulation runs, reading their series in one streaming pass', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('runs',
+		nargs = '+',
+		help = 'Result folders of runs, or folders of run folders (Sweep.py)')
+	parser.add_argument('--chunkrows',
+		type = int,
+		help = 'Steps read at a time from every series',
+		default = 1024)
+	parser.add_argument('--processes',
+		type = int,
+		help = 'Worker processes, 0 for one per core',
+		default = 0)
+	parser.add_argument('--output',
+		help = 'File for the comparison table (csv)',
+		default = None)
+	args = parser.parse_args()
+
+	runs = analytics.find_runs(args.runs)
+	processes = args.processes if args.processes > 0 else multiprocessing.cpu_count()
+	processes = min(processes, len(runs))
+	start = time.time()
+	pool = multiprocessing.Pool(processes)
+	rows = pool.map(analyze_run, [(x, args.chunkrows) for x in runs])
+	pool.close()
+	pool.join()
+	failed = [x for x in rows if 'error' in x]
+	rows = [x for x in rows if 'error' not in x]
+	rows.sort(key=lambda x: (x['strategy'], x['run']))
+	print(analytics.format_table(rows))
+	if args.output is not None:
+		analytics.write_csv(args.output, rows)
+	print("[Analyze]: %d runs in %.1f s"%(len(rows), time.time() - start))
+	for row in failed:
+		print("[Analyze]: failed %s (%s)"%(row['run'], row['error']))
+	if len(failed) > 0:
+		exit(-1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import libs.Plan as plan
+import libs.VMFleet as vmf
+import libs.PhysicalMachine as pm
+import libs.MigrationManager as mm
+import libs.Trace as trace
+import libs.Seeding as seeding
+import Simulation
+
+phases = ('load', 'aggregate', 'decide', 'log')
+default_sizes = ('3x10', '30x100', '300x1000', '1000x10000', '10000x100000')
+
+def parse_size(size):
+	# 'PMSxVMS', for example 300x1000
+	try:
+		num_pms, num_vms = [int(x) for x in size.lower().split('x')]
+	except ValueError:
+		print("[Benchmark]: Sizes are written PMSxVMS, not %s"%size)
+		exit(-1)
+	return num_pms, num_vms
+
+def build_synthetic(num_pms, num_vms, seed=100):
+	# Data center of num_pms 16 core pms and num_vms vms with a random plan
+	# and a nominal load of 1, 2 or 4 cores, about 0.75 of the capacity when
+	# there are ten vms per pm, spread over the pms at random (as the random
+	# placement of a scenario). The fleet is built directly, without one
+	# VirtualMachine object per vm.
+	random = seeding.build_generator(seed)
+	physical_machines = [pm.PhysicalMachine(16) for i in range(0, num_pms)]
+	plans = sorted(plan.Plan.plan_types)
+	load_nominal = random.choice([1.0, 2.0, 4.0], size=num_vms)
+	vm_plans = [plans[x] for x in random.integers(len(plans), size=num_vms)]
+	hosts = random.integers(num_pms, size=num_vms)
+	fleet = vmf.VMFleet(load_nominal, np.ones(num_vms), vm_plans, hosts, seed=seed)
+	fleet.compute_volume_sandpiper(np.arange(num_vms), \
+		physical_machines[0].get_cores(), physical_machines[0].get_memory())
+	return physical_machines, fleet, hosts
+
+def run_point(job):
+	# times one strategy on one data center size, in a fresh worker process
+	strategy, num_pms, num_vms, steps, trace_format, trace_series = job
+	physical_machines, fleet, hosts = build_synthetic(num_pms, num_vms)
+	outdir = tempfile.mkdtemp(prefix='benchmark_')
+	sink = trace.open_sink(trace_format, outdir, trace.parse_series(trace_series))
+	manager = mm.MigrationManager(outdir, strategy, physical_machines, fleet, 0, trace=sink, \
+		initial_placement=hosts)
+	timings = dict((x, 0.0) for x in phases)
+	clock = time.perf_counter
+	start = clock()
+	for i in range(0, steps):
+		t0 = clock()
+		fleet.execute()
+		t1 = clock()
+		manager.measure(i)
+		t2 = clock()
+		manager.decide()
+		manager.normalize()
+		t3 = clock()
+		manager.log()
+		t4 = clock()
+		timings['load'] += t1 - t0
+		timings['aggregate'] += t2 - t1
+		timings['decide'] += t3 - t2
+		timings['log'] += t4 - t3
+	manager.close()
+	total = clock() - start
+	shutil.rmtree(outdir)
+	return {'strategy': strategy, 'pms': num_pms, 'vms': num_vms, 'steps': steps, \
+		'phases': timings, 'total': total, 'per_step': total / steps, \
+		'migrations': manager.total_migrations, \
+		'peak_memory_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+def key(result):
+	return '%s/%dx%d'%(result['strategy'], result['pms'], result['vms'])
+
+def compare(results, baseline, tolerance):
+	# per point and phase slowdown of the time per step against a baseline,
+	# regressions are the ratios above tolerance (phases shorter than 10 us
+	# per step are ignored)
+	reference = dict((key(x), x) for x in baseline['results'])
+	regressions = list()
+	print("%-46s %10s %10s %8s"%('point (ms/step)', 'baseline', 'current', 'ratio'))
+	for result in results:
+		other = reference.get(key(result))
+		if other is None:
+			continue
+		for phase in phases + ('total',):
+			before = other['total'] if phase == 'total' else other['phases'][phase]
+			after = result['total'] if phase == 'total' else result['phases'][phase]
+			before /= other['steps']
+			after /= result['steps']
+			if before < 1e-5 and after < 1e-5:
+				continue
+			ratio = after / max(before, 1e-9)
+			flag = ''
+			if ratio > tolerance:
+				regressions.append((key(result), phase, ratio))
+				flag = ' <'
+			print("%-46s %10.4f %10.4f %8.2f%s"%(key(result) + ' ' + phase, \
+				1e3 * before, 1e3 * after, ratio, flag))
+	return regressions
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Scaling benchmark of the migration strategies', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('--strategy',
+		nargs = '+',
+		help = 'Migration algorithms: ' + ' '.join(Simulation.migrationAlgorithms),
+		default = Simulation.migrationAlgorithms)
+	parser.add_argument('--sizes',
+		nargs = '+',
+		help = 'Data center sizes, as PMSxVMS',
+		default = list(default_sizes))
+	parser.add_argument('--steps',
+		type = int,
+		help = 'Simulation steps per point',
+		default = 50)
+	parser.add_argument('--trace',
+		help = 'Format of the result series written during the log phase: csv or npy',
+		default = 'csv')
+	parser.add_argument('--traceseries',
+		help = 'Comma separated result series to write, all or none',
+		default = 'all')
+	parser.add_argument('--output',
+		help = 'Results file (json)',
+		default = 'benchmark.json')
+	parser.add_argument('--baseline',
+		help = 'Results file of an earlier benchmark to compare with',
+		default = None)
+	parser.add_argument('--tolerance',
+		type = float,
+		help = 'Slowdown ratio against the baseline reported as a regression',
+		default = 1.25)
+	args = parser.parse_args()
+	for strategy in args.strategy:
+		if strategy not in Simulation.migrationAlgorithms:
+			print("Unsupported migration algorithm %s"%strategy)
+			parser.print_help()
+			quit()
+
+	jobs = list()
+	for size in args.sizes:
+		num_pms, num_vms = parse_size(size)
+		for strategy in args.strategy:
+			jobs.append((strategy, num_pms, num_vms, args.steps, args.trace, args.traceseries))
+
+	# one process per point, one at a time: timings are not disturbed by
+	# other points and the peak memory is the one of the point
+	results = list()
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	for result in pool.imap(run_point, jobs):
+		results.append(result)
+		print("[Benchmark]: %-36s %8.2f ms/step  %s  %d MB"%(key(result), \
+			1e3 * result['per_step'], \
+			' '.join(['%s %.2f'%(x, 1e3 * result['phases'][x] / result['steps']) for x in phases]), \
+			result['peak_memory_kb'] // 1024))
+	pool.close()
+	pool.join()
+
+	document = {'python': platform.python_version(), 'numpy': np.__version__, \
+		'machine': platform.machine(), 'steps': args.steps, 'trace': args.trace, \
+		'results': results}
+	with open(args.output, 'w') as f:
+		json.dump(document, f, indent=1, sort_keys=True)
+
+	if args.baseline is not None:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		regressions = compare(results, baseline, args.tolerance)
+		if len(regressions) > 0:
+			print("[Benchmark]: %d regressions above %.2fx"%(len(regressions), args.tolerance))
+			exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import libs.MigrationManager as mm
+import libs.Trace as trace
+import libs.Streaming as streaming
+import Simulation
+
+def encode_line(document):
+	return (json.dumps(document, sort_keys=True) + '\n').encode('ascii')
+
+async def serve_stdin(controller):
+	# samples from stdin (a pipe), decisions to stdout
+	loop = asyncio.get_running_loop()
+	reader = asyncio.StreamReader(limit=streaming.line_limit)
+	await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+	out = sys.stdout.buffer
+	def emit(decision):
+		out.write(encode_line(decision))
+		out.flush()
+	await controller.session(reader, emit)
+	out.write(encode_line({'summary': controller.summary()}))
+	out.flush()
+
+async def serve_socket(controller, path, once):
+	# samples from the clients of a unix socket, one at a time, decisions back
+	# to the client; the manager state carries over from one client to the next
+	lock = asyncio.Lock()
+	finished = asyncio.Event()
+	async def handle(reader, writer):
+		async with lock:
+			def emit(decision):
+				writer.write(encode_line(decision))
+			try:
+				await controller.session(reader, emit)
+				writer.write(encode_line({'summary': controller.summary()}))
+				await writer.drain()
+			except (ValueError, ConnectionError) as e:
+				print("[Controller]: Client dropped: %s"%e)
+			writer.close()
+			if once:
+				finished.set()
+	if os.path.exists(path):
+		os.unlink(path)
+	server = await asyncio.start_unix_server(handle, path, limit=streaming.line_limit)
+	print("[Controller]: Listening on %s"%path)
+	async with server:
+		await finished.wait()
+	os.unlink(path)
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Migration controller fed with live load samples (see ReplayClient.py)', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('--scenario',
+		help = 'Data center: name of a bundled scenario or scenario file; the vms of the samples are its vms',
+		default = 'small')
+	parser.add_argument('--strategy',
+		help = 'Migration algorithms: ' + ' '.join(Simulation.migrationAlgorithms),
+		default = 'load_aware_woi')
+	parser.add_argument('--normalizationperiod',
+		type = int,
+		help = 'Load normalization: 0 if inactive, 10 for every ten steps',
+		default = 0)
+	parser.add_argument('--seed',
+		type = int,
+		help = 'Seed of the data center and of the migration decisions',
+		default = 100)
+	parser.add_argument('--targetutilization',
+		type = float,
+		help = 'Utilization set point, as a fraction of the cores',
+		default = 0.75)
+	parser.add_argument('--targetrelocation',
+		type = float,
+		help = 'Relocation threshold, as a fraction of the cores',
+		default = 1.1)
+	parser.add_argument('--windowsize',
+		type = int,
+		help = 'Steps in the window overload index',
+		default = 10)
+	parser.add_argument('--migrationbudget',
+		type = int,
+		help = 'Migrations planned per step',
+		default = 1)
+	parser.add_argument('--pmmigrationbudget',
+		type = int,
+		help = 'Migrations out of one physical machine per step',
+		default = 1)
+	parser.add_argument('--socket',
+		help = 'Unix socket to listen on; samples are read from stdin if not given',
+		default = None)
+	parser.add_argument('--once',
+		action = 'store_true',
+		help = 'Stop after the first socket client')
+	parser.add_argument('--format',
+		help = 'Sample frames: ' + ' '.join(streaming.formats),
+		default = 'binary')
+	parser.add_argument('--queue',
+		type = int,
+		help = 'Samples waiting to be run before the sender is held back',
+		default = 64)
+	parser.add_argument('--policy',
+		help = 'Waiting samples: coalesce (run only the newest) or block (run them all)',
+		default = 'coalesce')
+	parser.add_argument('--outdir',
+		help = 'Folder for the result series of the controlled steps, none if not given',
+		default = None)
+	parser.add_argument('--trace',
+		help = 'Format of the result series: csv or npy',
+		default = 'csv')
+	parser.add_argument('--traceseries',
+		help = 'Comma separated result series to write, all or none',
+		default = 'all')
+	args = parser.parse_args()
+	if args.strategy not in Simulation.migrationAlgorithms:
+		print("Unsupported migration algorithm %s"%args.strategy)
+		parser.print_help()
+		quit()
+	if args.format not in streaming.formats or args.policy not in streaming.policies:
+		print("Unsupported format %s or policy %s"%(args.format, args.policy))
+		parser.print_help()
+		quit()
+
+	physical_machines, fleet, hosts = Simulation.build(args.scenario, args.seed)
+	if args.outdir is not None:
+		Simulation.mkdir_p(args.outdir)
+		sink = trace.open_sink(args.trace, args.outdir, trace.parse_series(args.traceseries))
+	else:
+		sink = trace.CSVTraceSink(None, ())
+	manager = mm.MigrationManager(args.outdir, args.strategy, physical_machines, fleet, \
+		args.normalizationperiod, target_utilization=args.targetutilization, \
+		target_relocation=args.targetrelocation, window_size=args.windowsize, \
+		migration_budget=args.migrationbudget, pm_migration_budget=args.pmmigrationbudget, \
+		trace=sink, seed=args.seed, initial_placement=hosts)
+	controller = streaming.Controller(manager, args.format, args.queue, args.policy)
+	try:
+		if args.socket is not None:
+			asyncio.run(serve_socket(controller, args.socket, args.once))
+		else:
+			asyncio.run(serve_stdin(controller))
+	except ValueError as e:
+		print("[Controller]: %s"%e, file=sys.stderr)
+		exit(-1)
+	except KeyboardInterrupt:
+		pass
+	controller.close()
+	if args.outdir is not None:
+		with open(os.path.join(args.outdir, 'summary.json'), 'w') as f:
+			json.dump(controller.summary(), f, indent=1, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import libs.Workload as workload
+import libs.Streaming as streaming
+
+def frames(args):
+	# sample frames of the trace steps, args.batch steps each
+	load, memory = workload.map_trace(args.trace)
+	last = load.shape[0] if args.steps is None else min(load.shape[0], args.offset + args.steps)
+	for row in range(args.offset, last, args.batch):
+		end = min(row + args.batch, last)
+		yield end - row, streaming.encode(args.format, row - args.offset, load[row:end], \
+			None if memory is None else memory[row:end])
+
+def replay_stdout(args):
+	# frames to stdout, for Controller.py reading stdin; the pipe holds
+	# the writes back when the controller is behind
+	out = sys.stdout.buffer
+	start = time.perf_counter()
+	sent = 0
+	for steps, frame in frames(args):
+		out.write(frame)
+		out.flush()
+		sent += steps
+		if args.rate > 0:
+			time.sleep(max(0.0, start + sent / args.rate - time.perf_counter()))
+
+async def replay_socket(args):
+	reader, writer = await asyncio.open_unix_connection(args.socket)
+	decisions = list()
+	summary = dict()
+	async def receive():
+		while True:
+			line = await reader.readline()
+			if not line:
+				return
+			document = json.loads(line)
+			if 'summary' in document:
+				summary.update(document['summary'])
+			else:
+				decisions.append(document)
+	receiver = asyncio.ensure_future(receive())
+	start = time.perf_counter()
+	sent = 0
+	for steps, frame in frames(args):
+		writer.write(frame)
+		await writer.drain() # held back while the controller queue is full
+		sent += steps
+		if args.rate > 0:
+			await asyncio.sleep(max(0.0, start + sent / args.rate - time.perf_counter()))
+	writer.write_eof()
+	await receiver
+	writer.close()
+	return sent, time.perf_counter() - start, decisions, summary
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Replay a workload trace to Controller.py as live load samples', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('trace',
+		help = 'Workload trace (TraceImport.py) or VMloads.npy series of a run')
+	parser.add_argument('--socket',
+		help = 'Unix socket of the controller; frames are written to stdout if not given',
+		default = None)
+	parser.add_argument('--format',
+		help = 'Sample frames: ' + ' '.join(streaming.formats),
+		default = 'binary')
+	parser.add_argument('--batch',
+		type = int,
+		help = 'Steps per frame',
+		default = 1)
+	parser.add_argument('--rate',
+		type = float,
+		help = 'Steps sent per second, 0 as fast as possible',
+		default = 0)
+	parser.add_argument('--offset',
+		type = int,
+		help = 'First trace step replayed, sent as step 0',
+		default = 0)
+	parser.add_argument('--steps',
+		type = int,
+		help = 'Steps replayed, all if not given',
+		default = None)
+	parser.add_argument('--output',
+		help = 'File for the decisions received (json lines)',
+		default = None)
+	args = parser.parse_args()
+	if args.format not in streaming.formats:
+		print("Unsupported format %s"%args.format)
+		parser.print_help()
+		quit()
+
+	if args.socket is None:
+		replay_stdout(args)
+		return
+	sent, elapsed, decisions, summary = asyncio.run(replay_socket(args))
+	if args.output is not None:
+		with open(args.output, 'w') as f:
+			for decision in decisions:
+				f.write(json.dumps(decision, sort_keys=True) + '\n')
+	print("[ReplayClient]: %d steps sent in %.2f s, %d decisions"%(sent, elapsed, len(decisions)))
+	print(json.dumps(summary, indent=1, sort_keys=True))
+
+if __name__ == "__main__":
+    main()
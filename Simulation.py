@@ -1,10 +1,18 @@
 import argparse
 import os
 import errno
+import json
+import time
 
-import libs.VirtualMachine as vm
-import libs.PhysicalMachine as pm
 import libs.MigrationManager as mm
+import libs.Trace as trace
+import libs.ReplicaBatch as rb
+import libs.Workload as workloads
+import libs.Checkpoint as checkpoint
+import libs.Instrumentation as instrumentation
+import libs.Scenario as scenarios
+import libs.Sharding as sharding
+import libs.Kernel as kernels
 
 def mkdir_p(path):
 	try:
@@ -14,60 +22,369 @@ def mkdir_p(path):
 			pass
 		else: raise
 
+migrationAlgorithms = ("random load_aware load_aware_woi migration_likelihood migration_likelihood_woi sandpiper").split()
+
+# defaults of the run parameters a scenario may set in its run section
+run_defaults = dict(strategy=migrationAlgorithms[0], normalization_period=0, steps=500, \
+	seed=100, replica=0, target_utilization=0.75, target_relocation=1.1, window_size=10, \
+	migration_budget=1, pm_migration_budget=1)
+
+def bundled_scenarios():
+	return sorted(os.path.splitext(x)[0] for x in os.listdir(scenarios.directory))
+
+def build(scenario, seed=100, replica=0):
+	# scenario: name of a bundled scenario (scenarios/) or path of a scenario file
+	return scenarios.build(scenarios.load(scenario), seed, replica)
+
+def run(outdir, scenario='small', strategy='random', normalization_period=0, \
+	steps=500, seed=100, replica=0, target_utilization=0.75, target_relocation=1.1, \
+	window_size=10, migration_budget=1, pm_migration_budget=1, trace_format='csv', \
+	trace_series='all', workload='synthetic', workload_trace=None, workload_offset=0, \
+	checkpoint_every=0, checkpoint_at_end=False, resume=False, fork_from=None, \
+	instrument=False, instrument_every=0, profile_steps=None, kernel='step', block_steps=64):
+	# runs one simulation of a scenario, writing config.json and summary.json
+	# next to the results; replica selects one of the independent random streams of the seed.
+	# checkpoint_every saves the state to checkpoint.npz every that many steps,
+	# checkpoint_at_end after the last step (for a longer run to resume from);
+	# resume continues the run in outdir from its checkpoint, fork_from starts
+	# from the checkpoint of another run (possibly of another strategy) and
+	# only simulates the steps after it. instrument writes per-phase timers and
+	# counters to instrumentation.json at the end (and every instrument_every
+	# steps); profile_steps (first, last) profiles that range of steps.
+	# kernel 'event' runs the quiescent steps in blocks of up to block_steps
+	# (libs/Kernel.py), with the same results as the 'step' kernel.
+	config = dict(scenario=scenario, strategy=strategy, normalization_period=normalization_period, \
+		steps=steps, seed=seed, replica=replica, target_utilization=target_utilization, \
+		target_relocation=target_relocation, window_size=window_size, \
+		migration_budget=migration_budget, pm_migration_budget=pm_migration_budget)
+	if workload != 'synthetic':
+		config.update(workload=workload, workload_trace=workload_trace, \
+			workload_offset=workload_offset)
+	checkpoint_file = os.path.join(outdir, 'checkpoint.npz')
+	state = None
+	offsets = None
+	elapsed = 0.0
+	if resume:
+		state, meta = checkpoint.load(checkpoint_file)
+		# a resumed run may run for more steps, and keeps the fork it started from
+		for key in ('fork_from', 'fork_step'):
+			if key in meta['config']:
+				config[key] = meta['config'][key]
+		if dict(meta['config'], steps=steps) != config:
+			print("The checkpoint in %s is of another configuration"%outdir)
+			exit(-1)
+		offsets = meta['trace']
+		elapsed = meta['elapsed']
+	elif fork_from is not None:
+		state, meta = checkpoint.load(fork_from)
+		for key in ('scenario', 'seed', 'replica', 'workload', 'workload_trace', 'workload_offset'):
+			if meta['config'].get(key) != config.get(key):
+				print("The checkpoint %s has another %s"%(fork_from, key))
+				exit(-1)
+		config.update(fork_from=os.path.abspath(fork_from), fork_step=meta['step'])
+	mkdir_p(outdir)
+	with open(os.path.join(outdir, 'config.json'), 'w') as f:
+		json.dump(config, f, indent=1, sort_keys=True)
+
+	physical_machines, fleet, hosts = build(scenario, seed, replica)
+	source = workloads.open_workload(workload, fleet, workload_trace, workload_offset)
+	if source.num_steps is not None and source.num_steps < steps:
+		print("The workload trace has %d steps, %d requested"%(source.num_steps, steps))
+		exit(-1)
+	sink = trace.open_sink(trace_format, outdir, trace.parse_series(trace_series), offsets)
+	migration_manager = mm.MigrationManager(outdir, strategy, physical_machines, \
+		fleet, normalization_period, target_utilization=target_utilization, \
+		target_relocation=target_relocation, window_size=window_size, \
+		migration_budget=migration_budget, pm_migration_budget=pm_migration_budget, \
+		trace=sink, seed=seed, replica=replica, initial_placement=hosts)
+	if state is not None:
+		migration_manager.set_state(state)
+	probe = None
+	if instrument or profile_steps is not None:
+		probe = instrumentation.Instrumentation(outdir, instrument_every, profile_steps)
+		probe.attach(migration_manager, source)
+
+	runner = kernels.open_kernel(kernel, migration_manager, source, block_steps)
+
+	start = time.time()
+	i = migration_manager.time_index + 1
+	while i < steps:
+		last = steps - 1
+		if checkpoint_every > 0:
+			last = min(last, (i // checkpoint_every + 1) * checkpoint_every - 1)
+		runner.advance(i, last)
+		i = last + 1
+		if (checkpoint_every > 0 and i % checkpoint_every == 0) or (checkpoint_at_end and i == steps):
+			sink.flush()
+			meta = {'step': last, 'config': config, 'trace': sink.offsets(), \
+				'elapsed': elapsed + time.time() - start}
+			checkpoint.save(checkpoint_file, migration_manager.get_state(), meta)
+	migration_manager.close()
+	if probe is not None:
+		probe.close()
+
+	summary = migration_manager.summary()
+	summary['elapsed'] = elapsed + time.time() - start
+	with open(os.path.join(outdir, 'summary.json'), 'w') as f:
+		json.dump(summary, f, indent=1, sort_keys=True)
+	return summary
+
+def run_replicas(outdir, replicas, scenario='small', strategy='random', \
+	normalization_period=0, steps=500, seed=100, target_utilization=0.75, \
+	target_relocation=1.1, window_size=10, migration_budget=1, pm_migration_budget=1):
+	# runs replicas 0 .. replicas-1 of one simulation and seed in one batch,
+	# writing one row per replica to replicas.csv and the confidence intervals
+	# of the totals to summary.json
+	config = dict(scenario=scenario, strategy=strategy, normalization_period=normalization_period, \
+		steps=steps, seed=seed, replicas=replicas, target_utilization=target_utilization, \
+		target_relocation=target_relocation, window_size=window_size, \
+		migration_budget=migration_budget, pm_migration_budget=pm_migration_budget)
+	mkdir_p(outdir)
+	with open(os.path.join(outdir, 'config.json'), 'w') as f:
+		json.dump(config, f, indent=1, sort_keys=True)
+
+	physical_machines, fleet, hosts = build(scenario, seed)
+	batch = rb.ReplicaBatch(strategy, physical_machines, fleet, normalization_period, \
+		seed, range(0, replicas), target_utilization=target_utilization, \
+		target_relocation=target_relocation, window_size=window_size, \
+		migration_budget=migration_budget, pm_migration_budget=pm_migration_budget, \
+		initial_placement=hosts)
+
+	start = time.time()
+	for i in range(0, steps):
+		batch.execute(i)
+
+	rows = batch.summaries(steps)
+	keys = ('replica', 'total_migrations', 'overload_time', 'steps')
+	with open(os.path.join(outdir, 'replicas.csv'), 'w') as f:
+		f.write(', '.join(keys) + '\n')
+		for row in rows:
+			f.write(', '.join([str(row[k]) for k in keys]) + '\n')
+	summary = {'seed': seed, 'replicas': replicas, 'steps': steps}
+	for key in ('total_migrations', 'overload_time'):
+		mean, half_width = rb.confidence_interval([row[key] for row in rows])
+		summary[key] = mean
+		summary[key + '_ci95'] = half_width
+	summary['elapsed'] = time.time() - start
+	with open(os.path.join(outdir, 'summary.json'), 'w') as f:
+		json.dump(summary, f, indent=1, sort_keys=True)
+	return summary
+
+def run_sharded(outdir, shards, scenario='small', strategy='random', \
+	normalization_period=0, steps=500, seed=100, replica=0, target_utilization=0.75, \
+	target_relocation=1.1, window_size=10, migration_budget=1, pm_migration_budget=1, \
+	exchange_every=10, cross_budget=1, trace_format='csv', trace_series='all'):
+	# runs one simulation split in shards of pms, one worker process each,
+	# exchanging vms between shards every exchange_every steps (see
+	# libs/Sharding.py); the shard series are in outdir/shard_<s>
+	config = dict(scenario=scenario, strategy=strategy, normalization_period=normalization_period, \
+		steps=steps, seed=seed, replica=replica, shards=shards, exchange_every=exchange_every, \
+		cross_budget=cross_budget, target_utilization=target_utilization, \
+		target_relocation=target_relocation, window_size=window_size, \
+		migration_budget=migration_budget, pm_migration_budget=pm_migration_budget)
+	mkdir_p(outdir)
+	with open(os.path.join(outdir, 'config.json'), 'w') as f:
+		json.dump(config, f, indent=1, sort_keys=True)
+
+	physical_machines, fleet, hosts = build(scenario, seed, replica)
+	start = time.time()
+	coordinator = sharding.Coordinator(outdir, shards, strategy, physical_machines, fleet, \
+		normalization_period, seed=seed, replica=replica, exchange_every=exchange_every, \
+		cross_budget=cross_budget, trace_format=trace_format, trace_series=trace_series, \
+		target_utilization=target_utilization, target_relocation=target_relocation, \
+		window_size=window_size, migration_budget=migration_budget, \
+		pm_migration_budget=pm_migration_budget)
+	try:
+		coordinator.run(steps)
+		summary = coordinator.close()
+	finally:
+		coordinator.release()
+	summary['elapsed'] = time.time() - start
+	with open(os.path.join(outdir, 'summary.json'), 'w') as f:
+		json.dump(summary, f, indent=1, sort_keys=True)
+	return summary
+
 def main():
 
 	parser = argparse.ArgumentParser( \
 		description='VM migration simulator', \
 		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
-	migrationAlgorithms = ("random load_aware load_aware_woi migration_likelihood migration_likelihood_woi sandpiper").split()
+	parser.add_argument('--scenario',
+		help = 'Data center: name of a bundled scenario (' + ' '.join(bundled_scenarios()) + \
+			') or scenario file; its run section sets the options left unset',
+		default = 'small')
 	parser.add_argument('--strategy',
 		help = 'Migration algorithms: ' + ' '.join(migrationAlgorithms),
-		default = migrationAlgorithms[0])
+		default = None)
 	parser.add_argument('--normalizationperiod',
 		type = int,
 		help = 'Load normalization: 0 if inactive, 10 for every ten steps',
-		default = 0)
+		default = None)
 	parser.add_argument('--outdir',
 		help = 'Destination folder for results and logs',
 		default = 'results')
 	parser.add_argument('--steps',
 		type = int,
 		help = 'Simulation steps',
-		default = 500)
+		default = None)
+	parser.add_argument('--seed',
+		type = int,
+		help = 'Seed of the data center, of the load streams and of the migration decisions',
+		default = None)
+	parser.add_argument('--replica',
+		type = int,
+		help = 'Index of the independent random streams of the seed used by a single run',
+		default = None)
+	parser.add_argument('--targetutilization',
+		type = float,
+		help = 'Utilization set point, as a fraction of the cores',
+		default = None)
+	parser.add_argument('--targetrelocation',
+		type = float,
+		help = 'Relocation threshold, as a fraction of the cores',
+		default = None)
+	parser.add_argument('--windowsize',
+		type = int,
+		help = 'Steps in the window overload index',
+		default = None)
+	parser.add_argument('--migrationbudget',
+		type = int,
+		help = 'Migrations planned per step, 1 for one decision per step',
+		default = None)
+	parser.add_argument('--pmmigrationbudget',
+		type = int,
+		help = 'Migrations out of one physical machine per step',
+		default = None)
+	parser.add_argument('--trace',
+		help = 'Format of the result series: csv or npy (convert with TraceToCSV.py)',
+		default = 'csv')
+	parser.add_argument('--traceseries',
+		help = 'Comma separated result series to write, all or none',
+		default = 'all')
+	parser.add_argument('--replicas',
+		type = int,
+		help = 'Independent replicas run as one batch (replica 0, 1, ... of the seed); 1 for a single traced run',
+		default = 1)
+	parser.add_argument('--kernel',
+		help = 'Time advance: step (every step in turn) or event (quiescent steps in blocks, same results)',
+		default = 'step')
+	parser.add_argument('--blocksteps',
+		type = int,
+		help = 'Longest block of quiescent steps of the event kernel',
+		default = 64)
+	parser.add_argument('--shards',
+		type = int,
+		help = 'Shards of contiguous pms, each run by its own process; 1 for a flat run',
+		default = 1)
+	parser.add_argument('--exchangeevery',
+		type = int,
+		help = 'Steps between two exchanges of vms between shards, 0 never',
+		default = 10)
+	parser.add_argument('--crossbudget',
+		type = int,
+		help = 'Vms a shard sends to another one per exchange',
+		default = 1)
+	parser.add_argument('--workload',
+		help = 'Source of the actual loads: synthetic or trace (replay of --workloadtrace)',
+		default = 'synthetic')
+	parser.add_argument('--workloadtrace',
+		help = 'Workload trace to replay, a file written by TraceImport.py or a VMloads.npy series',
+		default = None)
+	parser.add_argument('--workloadoffset',
+		type = int,
+		help = 'First trace step replayed',
+		default = 0)
+	parser.add_argument('--checkpointevery',
+		type = int,
+		help = 'Save the simulation state to checkpoint.npz every that many steps, 0 never',
+		default = 0)
+	parser.add_argument('--resume',
+		action = 'store_true',
+		help = 'Continue the interrupted run in outdir from its checkpoint')
+	parser.add_argument('--forkfrom',
+		help = 'Start from the checkpoint of another run, with this strategy and outdir',
+		default = None)
+	parser.add_argument('--instrument',
+		action = 'store_true',
+		help = 'Write per-phase timers and counters to instrumentation.json')
+	parser.add_argument('--instrumentevery',
+		type = int,
+		help = 'Also write instrumentation.json every that many steps, 0 only at the end',
+		default = 0)
+	parser.add_argument('--profilesteps',
+		help = 'Profile the steps FIRST:LAST (cProfile, profile_FIRST_LAST.prof)',
+		default = None)
 	args = parser.parse_args()
-	strategy = args.strategy
+	# options left unset come from the scenario, then from run_defaults
+	params = dict(strategy=args.strategy, normalization_period=args.normalizationperiod, \
+		steps=args.steps, seed=args.seed, replica=args.replica, \
+		target_utilization=args.targetutilization, target_relocation=args.targetrelocation, \
+		window_size=args.windowsize, migration_budget=args.migrationbudget, \
+		pm_migration_budget=args.pmmigrationbudget)
+	settings = scenarios.load(args.scenario).get('run', {})
+	for key in settings:
+		if key not in run_defaults:
+			print("Unsupported run parameter %s in scenario %s"%(key, args.scenario))
+			quit()
+	for key, value in params.items():
+		if value is None:
+			params[key] = settings.get(key, run_defaults[key])
+	strategy = params['strategy']
 	if strategy not in migrationAlgorithms:
-		print "Unsupported migration algorithm %s"%format(strategy)
+		print("Unsupported migration algorithm %s"%format(strategy))
+		parser.print_help()
+		quit()
+
+	profile_steps = None
+	if args.profilesteps is not None:
+		profile_steps = tuple(int(x) for x in args.profilesteps.split(':'))
+
+	if args.kernel not in kernels.kernels:
+		print("Unsupported kernel %s"%args.kernel)
 		parser.print_help()
 		quit()
-	mkdir_p(args.outdir)
-
-	# ---------------------------------------------------------------------------
-	# simulation: defining data center
-	pm0 = pm.PhysicalMachine(8) # number of cores
-	pm1 = pm.PhysicalMachine(8)
-	pm2 = pm.PhysicalMachine(8)
-	physical_machines = [pm0, pm1, pm2]
-
-	vm0 = vm.VirtualMachine(physical_machines[0],'gold', 4) # plan and nominal load
-	vm1 = vm.VirtualMachine(physical_machines[0],'gold', 2)
-	vm2 = vm.VirtualMachine(physical_machines[0],'silver', 4)
-	vm3 = vm.VirtualMachine(physical_machines[0],'silver', 3)
-	vm4 = vm.VirtualMachine(physical_machines[0],'silver', 2)
-	vm5 = vm.VirtualMachine(physical_machines[0],'basic', 6)
-	vm6 = vm.VirtualMachine(physical_machines[0],'basic', 2)
-	vm7 = vm.VirtualMachine(physical_machines[0],'basic', 2)
-	virtual_machines = [vm0, vm1, vm2, vm3, vm4, vm5, vm6, vm7]
-	# ---------------------------------------------------------------------------
-
-	migration_manager = mm.MigrationManager(args.outdir, args.strategy, physical_machines, \
-		virtual_machines, args.normalizationperiod)
-
-	for i in range(0, args.steps):
-		# generate actual loads (random number, method defined in VirtualMachine)
-		[x.execute() for x in virtual_machines]
-		migration_manager.execute(i)
+	if args.kernel != 'step' and (args.shards > 1 or args.replicas > 1 or \
+		args.instrument or profile_steps is not None):
+		print("The event kernel runs single, uninstrumented runs")
+		quit()
+
+	if args.shards > 1:
+		if args.replicas > 1 or args.workload != 'synthetic' or args.checkpointevery > 0 or \
+			args.resume or args.forkfrom is not None or args.instrument or profile_steps is not None:
+			print("Sharded runs need a single replica of the synthetic workload, without checkpoints or instrumentation")
+			quit()
+		summary = run_sharded(args.outdir, args.shards, args.scenario, \
+			exchange_every=args.exchangeevery, cross_budget=args.crossbudget, \
+			trace_format=args.trace, trace_series=args.traceseries, **params)
+		print("total migrations %d (%d between shards), overload time %d"% \
+			(summary['total_migrations'], summary['cross_migrations'], summary['overload_time']))
+		return
+
+	if args.replicas > 1:
+		if args.workload != 'synthetic':
+			print("Replicas need the synthetic workload")
+			quit()
+		# a batch only writes the totals of its replicas
+		if args.replica is not None or args.trace != parser.get_default('trace') or \
+			args.traceseries != parser.get_default('traceseries') or args.checkpointevery > 0 or \
+			args.resume or args.forkfrom is not None or args.instrument or args.instrumentevery > 0 or \
+			profile_steps is not None:
+			print("Replicas run without --replica, result series, checkpoints or instrumentation")
+			exit(-1)
+		params.pop('replica')
+		summary = run_replicas(args.outdir, args.replicas, args.scenario, **params)
+		print("total migrations %.1f +- %.1f, overload time %.1f +- %.1f (95%% CI, %d replicas)"% \
+			(summary['total_migrations'], summary['total_migrations_ci95'], \
+			summary['overload_time'], summary['overload_time_ci95'], args.replicas))
+		return
+
+	run(args.outdir, args.scenario, trace_format=args.trace, trace_series=args.traceseries, \
+		workload=args.workload, workload_trace=args.workloadtrace, \
+		workload_offset=args.workloadoffset, checkpoint_every=args.checkpointevery, \
+		resume=args.resume, fork_from=args.forkfrom, instrument=args.instrument, \
+		instrument_every=args.instrumentevery, profile_steps=profile_steps, \
+		kernel=args.kernel, block_steps=args.blocksteps, **params)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import libs.Scenario as scenarios
+import Simulation
+
+grid_keys = ('strategy', 'normalization_period', 'target_utilization', \
+	'target_relocation', 'window_size', 'seed', 'replica')
+summary_keys = ('total_migrations', 'overload_time', 'steps', 'elapsed')
+
+def config_hash(config):
+	return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[0:12]
+
+def guarded(function, *args, **kwargs):
+	# Runs function in a pool worker, returning its result or a summary
+	# with the error. The error paths of the simulator print their reason
+	# and exit: a SystemExit left to the pool would kill the worker and the
+	# pool would wait for its task forever.
+	try:
+		return function(*args, **kwargs)
+	except SystemExit as e:
+		return {'error': 'exit %s'%e.code}
+	except Exception as e:
+		return {'error': repr(e)}
+
+def run_config(job):
+	# runs one configuration in its own folder, unless a previous sweep
+	# already completed it (summary.json is written last)
+	config, outdir = job
+	summary_file = os.path.join(outdir, 'summary.json')
+	if os.path.exists(summary_file):
+		with open(summary_file) as f:
+			return config, outdir, json.load(f), True
+	summary = guarded(Simulation.run, outdir, **config)
+	return config, outdir, summary, False
+
+def expand_grid(args):
+	values = [args.strategy, args.normalizationperiod, args.targetutilization, \
+		args.targetrelocation, args.windowsize, args.seed, args.replica]
+	for combination in itertools.product(*values):
+		config = dict(zip(grid_keys, combination))
+		config.update(scenario=args.scenario, steps=args.steps, \
+			migration_budget=args.migrationbudget, \
+			pm_migration_budget=args.pmmigrationbudget, \
+			trace_format=args.trace, trace_series=args.traceseries)
+		if args.forkfrom is not None:
+			config.update(fork_from=os.path.abspath(args.forkfrom))
+		yield config
+
+def write_summary(path, rows):
+	# one row per configuration; failed ones have no totals and their error
+	keys = ('outdir', 'scenario') + grid_keys + summary_keys + ('error',)
+	with open(path, 'w') as f:
+		f.write(', '.join(keys) + '\n')
+		for config, outdir, summary in sorted(rows, key=lambda x: x[1]):
+			values = dict(config, outdir=os.path.basename(outdir), **summary)
+			f.write(', '.join([str(values.get(x, '')) for x in keys]) + '\n')
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Parallel parameter sweep of the VM migration simulator', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('--scenario',
+		help = 'Data center: name of a bundled scenario (' + \
+			' '.join(Simulation.bundled_scenarios()) + ') or scenario file',
+		default = 'small')
+	parser.add_argument('--strategy',
+		nargs = '+',
+		help = 'Migration algorithms: ' + ' '.join(Simulation.migrationAlgorithms),
+		default = Simulation.migrationAlgorithms)
+	parser.add_argument('--normalizationperiod',
+		type = int, nargs = '+',
+		help = 'Load normalization periods, 0 if inactive',
+		default = [0])
+	parser.add_argument('--targetutilization',
+		type = float, nargs = '+',
+		help = 'Utilization set points, as a fraction of the cores',
+		default = [0.75])
+	parser.add_argument('--targetrelocation',
+		type = float, nargs = '+',
+		help = 'Relocation thresholds, as a fraction of the cores',
+		default = [1.1])
+	parser.add_argument('--windowsize',
+		type = int, nargs = '+',
+		help = 'Steps in the window overload index',
+		default = [10])
+	parser.add_argument('--seed',
+		type = int, nargs = '+',
+		help = 'Seeds',
+		default = [100])
+	parser.add_argument('--replica',
+		type = int, nargs = '+',
+		help = 'Independent random streams of each seed',
+		default = [0])
+	parser.add_argument('--steps',
+		type = int,
+		help = 'Simulation steps',
+		default = 500)
+	parser.add_argument('--migrationbudget',
+		type = int,
+		help = 'Migrations planned per step',
+		default = 1)
+	parser.add_argument('--pmmigrationbudget',
+		type = int,
+		help = 'Migrations out of one physical machine per step',
+		default = 1)
+	parser.add_argument('--trace',
+		help = 'Format of the result series: csv or npy',
+		default = 'csv')
+	parser.add_argument('--traceseries',
+		help = 'Comma separated result series to write, all or none',
+		default = 'all')
+	parser.add_argument('--forkfrom',
+		help = 'Start every configuration from this checkpoint (Simulation.py --checkpointevery)',
+		default = None)
+	parser.add_argument('--processes',
+		type = int,
+		help = 'Worker processes, 0 for one per core',
+		default = 0)
+	parser.add_argument('--outdir',
+		help = 'Destination folder, one sub folder per configuration',
+		default = 'sweep')
+	args = parser.parse_args()
+	scenarios.resolve(args.scenario)
+	for strategy in args.strategy:
+		if strategy not in Simulation.migrationAlgorithms:
+			print("Unsupported migration algorithm %s"%strategy)
+			parser.print_help()
+			quit()
+
+	Simulation.mkdir_p(args.outdir)
+	jobs = list()
+	for config in expand_grid(args):
+		name = '%s_%s'%(config['strategy'], config_hash(config))
+		jobs.append((config, os.path.join(args.outdir, name)))
+	processes = args.processes if args.processes > 0 else multiprocessing.cpu_count()
+	processes = min(processes, len(jobs))
+	print("[Sweep]: %d configurations on %d processes"%(len(jobs), processes))
+
+	start = time.time()
+	rows = list()
+	pool = multiprocessing.Pool(processes)
+	for config, outdir, summary, skipped in pool.imap_unordered(run_config, jobs):
+		rows.append((config, outdir, summary))
+		status = 'skipped' if skipped else 'done'
+		if 'error' in summary:
+			status = 'failed (%s)'%summary['error']
+		print("[Sweep]: %s %s"%(status, os.path.basename(outdir)))
+	pool.close()
+	pool.join()
+	write_summary(os.path.join(args.outdir, 'summary.csv'), rows)
+	failed = len([x for x in rows if 'error' in x[2]])
+	print("[Sweep]: finished in %.1f s, %d of %d configurations failed"%(time.time() - start, failed, len(rows)))
+	if failed > 0:
+		exit(-1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
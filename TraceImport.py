@@ -0,0 +1,23 @@
+import argparse
+
+import libs.Workload as workload
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Import csv load series as a workload trace for Simulation.py --workload trace', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('loads',
+		help = 'Csv file of actual loads, one line per step and one value per vm (VMloads.csv layout)')
+	parser.add_argument('--memories',
+		help = 'Csv file of actual memories in the same layout, nominal memories if not given',
+		default = None)
+	parser.add_argument('--output',
+		help = 'Workload trace file to write',
+		default = 'workload.trace')
+	args = parser.parse_args()
+	steps, vms = workload.import_csv(args.output, args.loads, args.memories)
+	print("[TraceImport]: %d steps of %d virtual machines written to %s"%(steps, vms or 0, args.output))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import argparse
+import os
+
+import libs.Trace as trace
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Convert the npy result series of a run to the csv layout', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('indir',
+		help = 'Folder with the .npy results of a run')
+	parser.add_argument('--outdir',
+		help = 'Destination folder for the .csv files, the input folder if not given',
+		default = None)
+	parser.add_argument('--traceseries',
+		help = 'Comma separated series to convert, all or none',
+		default = 'all')
+	args = parser.parse_args()
+	outdir = args.outdir if args.outdir is not None else args.indir
+	os.makedirs(outdir, exist_ok=True)
+	trace.npy_to_csv(args.indir, outdir, trace.parse_series(args.traceseries))
+
+if __name__ == "__main__":
+    main()
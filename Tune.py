@@ -0,0 +1,219 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+
+import libs.Seeding as seeding
+import libs.Scenario as scenarios
+import libs.ReplicaBatch as rb
+import Simulation
+import Sweep
+
+# both minimized
+objectives = ('total_migrations', 'overload_time')
+tuned_keys = ('target_utilization', 'target_relocation', 'window_size')
+
+def sample_configs(args, strategy):
+	# args.configs configurations of one strategy, from its own tuning stream;
+	# the window size only matters to the window overload index strategies,
+	# and sandpiper has no relocation threshold
+	random = seeding.tuning_generator(args.seed, strategy)
+	configs = list()
+	for i in range(0, args.configs):
+		target_utilization = float(random.uniform(*args.targetutilization))
+		target_relocation = float(random.uniform(*args.targetrelocation))
+		window_size = int(random.integers(args.windowsize[0], args.windowsize[1] + 1))
+		if strategy not in rb.woi_strategies:
+			window_size = Simulation.run_defaults['window_size']
+		if strategy == 'sandpiper':
+			target_relocation = Simulation.run_defaults['target_relocation']
+		configs.append(dict(scenario=args.scenario, strategy=strategy, \
+			normalization_period=args.normalizationperiod, seed=args.seed, replica=0, \
+			target_utilization=round(target_utilization, 4), \
+			target_relocation=round(target_relocation, 4), window_size=window_size, \
+			migration_budget=args.migrationbudget, pm_migration_budget=args.pmmigrationbudget, \
+			trace_format=args.trace, trace_series=args.traceseries))
+	return configs
+
+def run_rung(job):
+	# runs a configuration up to steps, continuing from the checkpoint saved
+	# at the end of the previous rung rather than from the start
+	config, outdir, steps, checkpoint_at_end, resume = job
+	summary = Sweep.guarded(Simulation.run, outdir, steps=steps, \
+		checkpoint_at_end=checkpoint_at_end, resume=resume, **config)
+	return config, outdir, summary
+
+def dominates(a, b):
+	return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+def pareto_ranks(points):
+	# rank 0 for the non dominated points, rank 1 once those are removed, ...
+	ranks = [None] * len(points)
+	rank = 0
+	left = list(range(0, len(points)))
+	while len(left) > 0:
+		front = [i for i in left if not any(dominates(points[j], points[i]) for j in left)]
+		for i in front:
+			ranks[i] = rank
+		left = [i for i in left if ranks[i] is None]
+		rank += 1
+	return ranks
+
+def promote(rows, keep):
+	# the keep best rows: lowest pareto rank, then lowest sum of the
+	# objectives scaled by their largest value
+	points = [tuple(x[2][k] for k in objectives) for x in rows]
+	ranks = pareto_ranks(points)
+	scales = [max(max(x[i] for x in points), 1) for i in range(0, len(objectives))]
+	order = sorted(range(0, len(rows)), key=lambda i: (ranks[i], \
+		sum(x / y for x, y in zip(points[i], scales)), rows[i][1]))
+	return [rows[i] for i in order[0:keep]]
+
+def write_front(path, fronts):
+	keys = ('strategy',) + tuned_keys + objectives + ('outdir',)
+	with open(path, 'w') as f:
+		f.write(', '.join(keys) + '\n')
+		for config, outdir, summary in fronts:
+			values = dict(config, outdir=os.path.basename(outdir), **summary)
+			f.write(', '.join([str(values[x]) for x in keys]) + '\n')
+
+def main():
+
+	parser = argparse.ArgumentParser( \
+		description='Successive halving search of the migration parameters, per strategy', \
+		formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+	parser.add_argument('--scenario',
+		help = 'Data center: name of a bundled scenario (' + \
+			' '.join(Simulation.bundled_scenarios()) + ') or scenario file',
+		default = 'small')
+	parser.add_argument('--strategy',
+		nargs = '+',
+		help = 'Migration algorithms: ' + ' '.join(Simulation.migrationAlgorithms),
+		default = Simulation.migrationAlgorithms)
+	parser.add_argument('--targetutilization',
+		type = float, nargs = 2,
+		help = 'Range of the utilization set point, as a fraction of the cores',
+		default = [0.5, 0.9])
+	parser.add_argument('--targetrelocation',
+		type = float, nargs = 2,
+		help = 'Range of the relocation threshold, as a fraction of the cores',
+		default = [0.9, 1.5])
+	parser.add_argument('--windowsize',
+		type = int, nargs = 2,
+		help = 'Range of the steps in the window overload index',
+		default = [2, 30])
+	parser.add_argument('--configs',
+		type = int,
+		help = 'Configurations sampled per strategy',
+		default = 27)
+	parser.add_argument('--eta',
+		type = int,
+		help = 'One configuration in eta is kept at every rung, for eta times the steps',
+		default = 3)
+	parser.add_argument('--rungs',
+		type = int,
+		help = 'Rungs of the successive halving, the last one runs all the steps',
+		default = 3)
+	parser.add_argument('--steps',
+		type = int,
+		help = 'Simulation steps of the last rung',
+		default = 500)
+	parser.add_argument('--normalizationperiod',
+		type = int,
+		help = 'Load normalization period, 0 if inactive',
+		default = 0)
+	parser.add_argument('--seed',
+		type = int,
+		help = 'Seed of the runs and of the sampled configurations',
+		default = 100)
+	parser.add_argument('--migrationbudget',
+		type = int,
+		help = 'Migrations planned per step',
+		default = 1)
+	parser.add_argument('--pmmigrationbudget',
+		type = int,
+		help = 'Migrations out of one physical machine per step',
+		default = 1)
+	parser.add_argument('--trace',
+		help = 'Format of the result series: csv or npy',
+		default = 'csv')
+	parser.add_argument('--traceseries',
+		help = 'Comma separated result series to write, all or none',
+		default = 'none')
+	parser.add_argument('--processes',
+		type = int,
+		help = 'Worker processes, 0 for one per core',
+		default = 0)
+	parser.add_argument('--outdir',
+		help = 'Destination folder, one sub folder per configuration',
+		default = 'tuning')
+	args = parser.parse_args()
+	scenarios.resolve(args.scenario)
+	for strategy in args.strategy:
+		if strategy not in Simulation.migrationAlgorithms:
+			print("Unsupported migration algorithm %s"%strategy)
+			parser.print_help()
+			quit()
+	if args.eta < 2 or args.rungs < 1 or args.configs < 1:
+		print("Use eta of 2 or more, at least one rung and one configuration")
+		parser.print_help()
+		quit()
+	rung_steps = [args.steps // args.eta**(args.rungs - 1 - r) for r in range(0, args.rungs)]
+	if rung_steps[0] < 1:
+		print("%d steps are too few for %d rungs of eta %d"%(args.steps, args.rungs, args.eta))
+		quit()
+
+	Simulation.mkdir_p(args.outdir)
+	candidates = dict()
+	for strategy in args.strategy:
+		candidates[strategy] = list()
+		for config in sample_configs(args, strategy):
+			name = '%s_%s'%(strategy, Sweep.config_hash(config))
+			candidates[strategy].append((config, os.path.join(args.outdir, name)))
+	processes = args.processes if args.processes > 0 else multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes)
+
+	start = time.time()
+	failed = list()
+	for rung, steps in enumerate(rung_steps):
+		# every rung but the last ends on a checkpoint, the next one resumes from it
+		last = rung == len(rung_steps) - 1
+		jobs = [(x, y, steps, not last, rung > 0) \
+			for strategy in args.strategy for x, y in candidates[strategy]]
+		print("[Tune]: rung %d, %d configurations of %d steps"%(rung, len(jobs), steps))
+		rows = list(pool.imap_unordered(run_rung, jobs))
+		Sweep.write_summary(os.path.join(args.outdir, 'rung_%d.csv'%rung), rows)
+		# failed configurations are reported and leave the search
+		for config, outdir, summary in rows:
+			if 'error' in summary:
+				print("[Tune]: failed %s (%s)"%(os.path.basename(outdir), summary['error']))
+				failed.append(outdir)
+		rows = [x for x in rows if 'error' not in x[2]]
+		if last:
+			break
+		for strategy in args.strategy:
+			results = [x for x in rows if x[0]['strategy'] == strategy]
+			keep = int(math.ceil(len(results) / float(args.eta)))
+			candidates[strategy] = [(x[0], x[1]) for x in promote(results, keep)] if keep > 0 else []
+	pool.close()
+	pool.join()
+
+	fronts = list()
+	for strategy in args.strategy:
+		results = sorted([x for x in rows if x[0]['strategy'] == strategy], key=lambda x: x[1])
+		ranks = pareto_ranks([tuple(x[2][k] for k in objectives) for x in results])
+		front = [x for x, y in zip(results, ranks) if y == 0]
+		fronts += sorted(front, key=lambda x: tuple(x[2][k] for k in objectives))
+	write_front(os.path.join(args.outdir, 'pareto.csv'), fronts)
+	print("[Tune]: Pareto front of %s over %d steps"%(' and '.join(objectives), args.steps))
+	for config, outdir, summary in fronts:
+		print("  %-26s utilization %.4f relocation %.4f window %3d: %6d migrations, %6d overload"% \
+			(config['strategy'], config['target_utilization'], config['target_relocation'], \
+			config['window_size'], summary['total_migrations'], summary['overload_time']))
+	print("[Tune]: finished in %.1f s, %d configurations failed"%(time.time() - start, len(failed)))
+	if len(failed) > 0:
+		exit(-1)
+
+if __name__ == "__main__":
+    main()
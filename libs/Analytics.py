@@ -0,0 +1,158 @@
+import numpy as np
+import itertools
+import json
+import os
+import libs.Plan as Plan
+import libs.Scenario as Scenario
+import libs.Checkpoint as Checkpoint
+
+# Metrics of a run, computed in one pass over its result series, a chunk of
+# rows at a time (csv files are read by lines, npy files are mapped), so the
+# memory does not grow with the steps:
+#   overload_time      pm steps over the cores of the pm (as summary.json)
+#   sla_<plan>         vm steps on an overloaded pm, per plan
+#   migrations         migrations, vms migrated at least once, most of one vm
+#   imbalance          mean over the steps of the deviation of the pm utilizations
+#   peak_utilization   highest pm utilization
+# The data center of config.json is built again for the cores, the plans and
+# the initial placement; the hosts of every step follow from MMmigrations
+# (a migration of step t moves the vm after the loads of step t are measured).
+# Only PMloads and MMmigrations are read, not the per-vm series; a run traced
+# without one of them cannot be analyzed.
+
+plans = tuple(sorted(Plan.Plan.plan_types, key=Plan.Plan.plan_types.get))
+columns = ('run', 'strategy', 'steps', 'overload_time') + tuple('sla_' + x for x in plans) + \
+	('migrations', 'migrated_vms', 'max_vm_migrations', 'imbalance', 'peak_utilization')
+
+required = ('PMloads', 'MMmigrations')
+
+def series_path(outdir, name):
+	# the npy or csv file of a series, None if the run did not write it
+	for extension in ('.npy', '.csv'):
+		path = os.path.join(outdir, name + extension)
+		if os.path.exists(path):
+			return path
+	return None
+
+def has_results(outdir):
+	return os.path.exists(os.path.join(outdir, 'config.json')) and \
+		series_path(outdir, 'PMloads') is not None
+
+def find_runs(paths):
+	# run folders among paths and their sub folders (a sweep folder)
+	runs = list()
+	for path in paths:
+		if has_results(path):
+			runs.append(path)
+			continue
+		found = sorted(os.path.join(path, x) for x in os.listdir(path) \
+			if has_results(os.path.join(path, x))) if os.path.isdir(path) else []
+		if len(found) == 0:
+			print("[Analytics]: No results of a run in %s"%path)
+			exit(-1)
+		runs += found
+	return runs
+
+def read_rows(outdir, name, chunk_rows=1024):
+	# (rows, width) float arrays of a series, chunk_rows rows at a time
+	path = series_path(outdir, name)
+	if path.endswith('.npy'):
+		data = np.load(path, mmap_mode='r')
+		for start in range(0, data.shape[0], chunk_rows):
+			yield np.array(data[start:start+chunk_rows], dtype=float)
+		return
+	with open(path) as f:
+		while True:
+			lines = list(itertools.islice(f, chunk_rows))
+			if len(lines) == 0:
+				return
+			width = lines[0].count(',') + 1
+			values = np.fromstring(','.join(lines), sep=',')
+			yield values.reshape(len(lines), width)
+
+def analyze(outdir, chunk_rows=1024):
+	with open(os.path.join(outdir, 'config.json')) as f:
+		config = json.load(f)
+	if 'shards' in config or 'replicas' in config:
+		print("[Analytics]: %s is a sharded or replica batch run, without per-step series"%outdir)
+		exit(-1)
+	missing = [x for x in required if series_path(outdir, x) is None]
+	if len(missing) > 0:
+		print("[Analytics]: %s has no %s series, run it with --traceseries all or %s"% \
+			(outdir, ' or '.join(missing), ','.join(required)))
+		exit(-1)
+	physical_machines, fleet, hosts = Scenario.build(Scenario.load(config['scenario']), \
+		config['seed'], config.get('replica', 0))
+	cores = np.array([x.get_cores() for x in physical_machines], dtype=float)
+	num_pms = len(cores)
+	step = 0
+	if 'fork_from' in config:
+		# the series start after the step of the checkpoint the run forked from
+		state, meta = Checkpoint.load(config['fork_from'])
+		hosts = state['fleet.hosts']
+		step = config['fork_step'] + 1
+	plan_index = fleet.plan_types.astype(np.intp) - 1
+	# vms of every plan on every pm
+	members = np.zeros((num_pms, len(plans)))
+	np.add.at(members, (hosts, plan_index), 1)
+
+	events = read_rows(outdir, 'MMmigrations', chunk_rows)
+	pending = np.zeros((0, 5))
+	vm_migrations = np.zeros(len(fleet), dtype=np.int64)
+	overload_time = 0
+	sla = np.zeros(len(plans))
+	imbalance = 0.0
+	peak = 0.0
+	steps = 0
+	for loads in read_rows(outdir, 'PMloads', chunk_rows):
+		rows = loads.shape[0]
+		over = loads > cores
+		overload_time += int(np.count_nonzero(over))
+		utilization = loads / cores
+		imbalance += float(np.sum(np.std(utilization, axis=1)))
+		peak = max(peak, float(np.max(utilization)))
+		# the migrations of these steps, read ahead as needed
+		while len(pending) == 0 or pending[-1, 1] < step + rows:
+			chunk = next(events, None)
+			if chunk is None:
+				break
+			pending = np.concatenate([pending, chunk])
+		count = int(np.searchsorted(pending[:, 1], step + rows, 'left'))
+		done, pending = pending[0:count].astype(np.intp), pending[count:]
+		# steps between two migrations have the same members
+		start = 0
+		for event_step, vm, source, destination in done[:, 1:5].tolist():
+			end = event_step - step + 1
+			sla += np.sum(over[start:end], axis=0) @ members
+			start = end
+			members[source, plan_index[vm]] -= 1
+			members[destination, plan_index[vm]] += 1
+			vm_migrations[vm] += 1
+		sla += np.sum(over[start:rows], axis=0) @ members
+		step += rows
+		steps += rows
+
+	metrics = {'run': os.path.basename(os.path.normpath(outdir)), 'strategy': config['strategy'], \
+		'steps': steps, 'overload_time': overload_time, \
+		'migrations': int(np.sum(vm_migrations)), \
+		'migrated_vms': int(np.count_nonzero(vm_migrations)), \
+		'max_vm_migrations': int(np.max(vm_migrations)) if len(vm_migrations) > 0 else 0, \
+		'imbalance': imbalance / steps if steps > 0 else 0.0, 'peak_utilization': peak}
+	for name, value in zip(plans, sla.tolist()):
+		metrics['sla_' + name] = int(value)
+	return metrics
+
+def format_table(rows):
+	# fixed width text table of the metrics rows
+	cells = [list(columns)]
+	for row in rows:
+		cells.append(['%.4f'%row[x] if isinstance(row[x], float) else str(row[x]) for x in columns])
+	widths = [max(len(x[i]) for x in cells) for i in range(0, len(columns))]
+	return '\n'.join('  '.join(x.rjust(w) if i > 1 else x.ljust(w) \
+		for i, (x, w) in enumerate(zip(line, widths))) for line in cells)
+
+def write_csv(path, rows):
+	with open(path, 'w') as f:
+		f.write(', '.join(columns) + '\n')
+		for row in rows:
+			f.write(', '.join([str(row[x]) for x in columns]) + '\n')
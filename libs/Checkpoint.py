@@ -0,0 +1,25 @@
+import numpy as np
+import json
+import os
+
+# A checkpoint is a .npz archive of the named state arrays of a run, plus a
+# json document (the 'meta' entry) with the step, the configuration and the
+# trace offsets. It is written to a temporary file and renamed, so an
+# interrupted write leaves the previous checkpoint in place.
+
+def save(path, state, meta):
+	arrays = dict(state)
+	arrays['meta'] = np.frombuffer(json.dumps(meta, sort_keys=True).encode('utf-8'), dtype=np.uint8)
+	temporary = path + '.tmp'
+	with open(temporary, 'wb') as f:
+		np.savez(f, **arrays)
+	os.replace(temporary, path)
+
+def load(path):
+	if not os.path.exists(path):
+		print("[Checkpoint]: No checkpoint %s"%path)
+		exit(-1)
+	with np.load(path) as data:
+		meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+		state = dict((name, data[name]) for name in data.files if name != 'meta')
+	return state, meta
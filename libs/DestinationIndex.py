@@ -0,0 +1,94 @@
+import numpy as np
+
+class DestinationIndex:
+	# Physical machines ordered by a per-pm key, best first ('min' or 'max').
+	# refresh() only stores the new keys. The first queries on a snapshot
+	# of keys are linear scans; once sort_after of them hit the same
+	# snapshot, the order is sorted and later queries walk it. update()
+	# changes single keys after a migration; with a sorted order those pms
+	# are marked stale instead of re-sorting, and compared one by one until
+	# there are enough of them to make a new sort cheaper.
+	sort_after = 8
+
+	def __init__(self, keys, order='min'):
+		if order not in ('min', 'max'):
+			print("[DestinationIndex]: Unsupported order %s"%order)
+			exit(-1)
+		self.sign = 1.0 if order == 'min' else -1.0
+		self.refresh(keys)
+
+	def refresh(self, keys):
+		self.keys = np.array(keys, dtype=float)
+		self.order = None
+		self.stale = set()
+		self.queries = 0
+
+	def update(self, pm, key):
+		self.keys[pm] = key
+		if self.order is not None:
+			self.stale.add(pm)
+
+	def get_key(self, pm):
+		return self.keys[pm]
+
+	def sort(self):
+		# stable, so ties go to the lowest pm index; nan keys end up last
+		self.order = np.argsort(self.sign * self.keys, kind='stable')
+		self.stale = set()
+
+	def is_better(self, pm, other):
+		if other is None:
+			return True
+		key = self.sign * self.keys[pm]
+		other_key = self.sign * self.keys[other]
+		return key < other_key or (key == other_key and pm < other)
+
+	def scan(self, exclude=None):
+		# best pm other than exclude by a linear pass, nan keys never win;
+		# exclude is set to the worst key for the pass, and the rare nan or
+		# excluded results go through an exact pass that skips them
+		keys = self.keys
+		if exclude is not None:
+			saved = keys[exclude]
+			keys[exclude] = self.sign * np.inf
+		best = int(np.argmin(keys) if self.sign > 0 else np.argmax(keys))
+		if exclude is not None:
+			keys[exclude] = saved
+		if best != exclude and not np.isnan(keys[best]):
+			return best
+		keys = self.sign * keys
+		if exclude is not None:
+			keys[exclude] = np.nan
+		if np.all(np.isnan(keys)):
+			return None
+		return int(np.nanargmin(keys))
+
+	def best(self, exclude=None, limit=None):
+		# best pm other than exclude, or None; with a limit, the key of the
+		# returned pm is not worse than limit
+		if self.order is None:
+			self.queries += 1
+			if self.queries < self.sort_after:
+				return self.check(self.scan(exclude), limit)
+			self.sort()
+		elif len(self.stale) > 16 + len(self.keys) // 64:
+			self.sort()
+		best = None
+		for position in range(0, len(self.order)):
+			pm = self.order[position]
+			if pm == exclude or pm in self.stale:
+				continue
+			if not np.isnan(self.keys[pm]):
+				best = pm
+			break
+		for pm in self.stale:
+			if pm != exclude and not np.isnan(self.keys[pm]) and self.is_better(pm, best):
+				best = pm
+		return self.check(best, limit)
+
+	def check(self, best, limit):
+		if best is None:
+			return None
+		if limit is not None and self.sign * self.keys[best] > self.sign * limit:
+			return None
+		return best
@@ -0,0 +1,169 @@
+import numpy as np
+import cProfile
+import json
+import os
+import time
+
+# Opt-in instrumentation of a run. attach() replaces the phase methods of one
+# MigrationManager (and of its workload source and trace files) by timed and
+# counting wrappers on that instance only; a manager that is not attached
+# runs the plain class methods, so a disabled instrumentation costs nothing.
+
+phases = ('load', 'gather', 'indexes', 'overload', 'decide', 'log', 'normalize')
+plan_methods = ('plan_migration_random', 'plan_migration_sandpiper', \
+	'plan_migration_loadaware', 'plan_migration_migrationlikelihood')
+
+class Histogram:
+	# power of two buckets: bucket i counts the values v with 2**(i-1) <= v < 2**i
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0
+		self.max = 0
+		self.buckets = [0] * 65
+
+	def add(self, value):
+		self.count += 1
+		self.total += value
+		if value > self.max:
+			self.max = value
+		self.buckets[int(value).bit_length()] += 1
+
+	def summary(self):
+		last = max([i for i, x in enumerate(self.buckets) if x > 0] + [0])
+		return {'count': self.count, 'total': self.total, 'max': self.max, \
+			'mean': self.total / self.count if self.count > 0 else 0.0, \
+			'buckets': self.buckets[0:last+1]}
+
+class CountingFile:
+	# file proxy counting the bytes written through it
+
+	def __init__(self, f, counters):
+		self.f = f
+		self.counters = counters
+
+	def write(self, data):
+		self.counters['log_bytes'] += len(data)
+		return self.f.write(data)
+
+	def __getattr__(self, name):
+		return getattr(self.f, name)
+
+class Profiler:
+	# default profiler of a step range: cProfile, saved to profile_<first>_<last>.prof
+
+	def __init__(self, outdir, first, last):
+		self.path = os.path.join(outdir, 'profile_%d_%d.prof'%(first, last))
+		self.profile = cProfile.Profile()
+
+	def start(self):
+		self.profile.enable()
+
+	def stop(self):
+		self.profile.disable()
+		self.profile.dump_stats(self.path)
+
+class Instrumentation:
+
+	def __init__(self, outdir, dump_every=0, profile_steps=None, profiler=None):
+		# profile_steps: (first, last) steps to profile; profiler: object with
+		# start() and stop(), a sampling profiler for example, cProfile if None
+		self.outdir = outdir
+		self.dump_every = dump_every
+		self.profile_steps = profile_steps
+		self.profiler = profiler
+		if profile_steps is not None and profiler is None:
+			self.profiler = Profiler(outdir, profile_steps[0], profile_steps[1])
+		self.clock = time.perf_counter_ns
+		self.timers = dict((x, Histogram()) for x in phases)
+		self.timers['step'] = Histogram()
+		self.counters = {'steps': 0, 'plan_calls': 0, 'source_candidates': 0, \
+			'vm_candidates': 0, 'migrations': 0, 'log_bytes': 0}
+		self.migrations_per_step = Histogram()
+		self.manager = None
+
+	def timed(self, name, function):
+		histogram = self.timers[name]
+		clock = self.clock
+		def wrapper(*args, **kwargs):
+			start = clock()
+			result = function(*args, **kwargs)
+			histogram.add(clock() - start)
+			return result
+		return wrapper
+
+	def attach(self, manager, source=None):
+		self.manager = manager
+		for name, method in (('gather', 'gather'), ('indexes', 'refresh_indexes'), \
+			('overload', 'update_overload'), ('decide', 'decide'), ('log', 'log'), \
+			('normalize', 'normalize')):
+			setattr(manager, method, self.timed(name, getattr(manager, method)))
+		for method in plan_methods:
+			setattr(manager, method, self.counted_plan(getattr(manager, method)))
+		migrate = manager.migrate
+		counters = self.counters
+		def counted_migrate(*args):
+			counters['migrations'] += 1
+			return migrate(*args)
+		manager.migrate = counted_migrate
+		execute = manager.execute
+		def step(time_index):
+			self.begin_step(time_index)
+			start = self.clock()
+			migrations = manager.total_migrations
+			execute(time_index)
+			self.timers['step'].add(self.clock() - start)
+			self.migrations_per_step.add(manager.total_migrations - migrations)
+			self.end_step(time_index)
+		manager.execute = step
+		if source is not None:
+			source.execute = self.timed('load', source.execute)
+		for name in list(manager.trace.files):
+			manager.trace.files[name] = CountingFile(manager.trace.files[name], self.counters)
+
+	def counted_plan(self, plan):
+		manager = self.manager
+		counters = self.counters
+		def wrapper(sources):
+			counters['plan_calls'] += 1
+			counters['source_candidates'] += int(np.count_nonzero(sources))
+			move = plan(sources)
+			if manager.strategy.startswith('migration_likelihood'):
+				# the vms of the source pms are scored
+				counters['vm_candidates'] += int(np.count_nonzero( \
+					sources[manager.placement.hosts[manager.likelihood.vms]]))
+			elif move is not None:
+				counters['vm_candidates'] += manager.placement.count_vms(move[1])
+			return move
+		return wrapper
+
+	def begin_step(self, time_index):
+		if self.profile_steps is not None and time_index == self.profile_steps[0]:
+			self.profiler.start()
+
+	def end_step(self, time_index):
+		self.counters['steps'] += 1
+		if self.profile_steps is not None and time_index == self.profile_steps[1]:
+			self.profiler.stop()
+		if self.dump_every > 0 and (time_index + 1) % self.dump_every == 0:
+			self.dump()
+
+	def summary(self):
+		return {'strategy': self.manager.strategy if self.manager is not None else None, \
+			'step': self.manager.time_index if self.manager is not None else None, \
+			'timers_ns': dict((x, y.summary()) for x, y in self.timers.items()), \
+			'counters': dict(self.counters), \
+			'migrations_per_step': self.migrations_per_step.summary()}
+
+	def dump(self):
+		# snapshot of the totals so far, replaced by every dump
+		path = os.path.join(self.outdir, 'instrumentation.json')
+		with open(path + '.tmp', 'w') as f:
+			json.dump(self.summary(), f, indent=1, sort_keys=True)
+		os.replace(path + '.tmp', path)
+
+	def close(self):
+		if self.profile_steps is not None and self.manager is not None and \
+			self.profile_steps[0] <= self.manager.time_index < self.profile_steps[1]:
+			self.profiler.stop() # the run ended inside the range
+		self.dump()
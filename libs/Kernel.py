@@ -0,0 +1,132 @@
+import numpy as np
+import copy
+import libs.ReplicaBatch as ReplicaBatch
+
+# Time advance of a run: advance(first, last) runs steps first .. last of a
+# MigrationManager and of its workload source.
+kernels = ('step', 'event')
+
+def open_kernel(kind, manager, source, block_steps=64):
+	if kind == 'step':
+		return StepKernel(manager, source)
+	elif kind == 'event':
+		return EventKernel(manager, source, block_steps)
+	print("[Kernel]: Unsupported kernel %s, use one of %s"%(kind, ' '.join(kernels)))
+	exit(-1)
+
+class StepKernel:
+	# every step measured, decided, logged and normalized in turn
+
+	def __init__(self, manager, source):
+		self.manager = manager
+		self.source = source
+
+	def advance(self, first, last):
+		for i in range(first, last + 1):
+			# actual loads of the step (synthetic or replayed, see libs/Workload.py)
+			self.source.execute(i)
+			self.manager.execute(i)
+
+class EventKernel:
+	# Runs quiescent stretches in bulk. The loads of the next steps are taken
+	# as one block (the synthetic streams are counter based, so a block can be
+	# drawn ahead and dropped), and the pm loads, overload indexes and windows
+	# of the whole block are computed with array operations, in the same
+	# order as the per-step code, so every value is bit for bit the same.
+	# The steps before the first one that needs a decision (a pm over its
+	# relocation threshold, a sandpiper trigger or a normalization) are
+	# logged and committed at once; that step goes through the per-step path.
+	# Blocks start at one step after a decision and double while quiet, and
+	# hold at most block_elements values per array.
+
+	def __init__(self, manager, source, block_steps=64, block_elements=1<<18):
+		self.manager = manager
+		self.source = source
+		width = max(manager.num_vms, manager.num_pms * manager.window_overload_matrix.shape[1], 1)
+		self.block_steps = max(1, min(block_steps, block_elements // width))
+		self.size = 1
+
+	def advance(self, first, last):
+		manager = self.manager
+		t = first
+		while t <= last:
+			count = min(self.size, last + 1 - t)
+			quiet = self.bulk(t, count) if count > 0 else 0
+			t += quiet
+			if count > 0 and quiet == count:
+				self.size = min(2 * count, self.block_steps)
+				continue
+			# step t needs a decision
+			self.source.execute(t)
+			manager.execute(t)
+			t += 1
+			# the integrated overload index only grows until a migration
+			# resets it, so a pm still over its threshold decides next step too
+			if manager.strategy in ReplicaBatch.ioi_strategies and \
+				np.any(manager.integrated_overload_index > manager.relocation_thresholds):
+				self.size = 0
+			else:
+				self.size = 1
+
+	def bulk(self, t, count):
+		# runs the quiet steps at the start of steps t .. t+count-1, returns their number
+		manager = self.manager
+		num_pms = manager.num_pms
+		loads = self.source.block(t, count)
+		index = (np.arange(0, count)[:, np.newaxis] * num_pms + manager.placement.hosts).ravel()
+		pm_loads = np.bincount(index, weights=loads.ravel(), \
+			minlength=count * num_pms).reshape(count, num_pms)
+		errors = pm_loads - manager.utilization_set_points
+		increments = np.maximum(0, np.divide(errors, pm_loads))
+		ioi = np.cumsum(np.concatenate([manager.integrated_overload_index[np.newaxis, :], \
+			increments]), axis=0)[1:]
+		window = manager.window_overload_matrix
+		size = window.shape[1]
+		# oldest error first: window column j holds the error of j steps ago
+		history = np.concatenate([window[:, ::-1].T, errors])
+		windows = np.stack([history[size-j:size-j+count] for j in range(0, size)], axis=-1)
+		woi = np.sum(windows, axis=-1)
+
+		events = np.zeros(count, dtype=bool)
+		if manager.normalization_period != 0:
+			events |= (t + np.arange(0, count)) % manager.normalization_period == 0
+		if manager.strategy in ReplicaBatch.ioi_strategies:
+			events |= np.any(ioi > manager.relocation_thresholds, axis=1)
+		elif manager.strategy in ReplicaBatch.woi_strategies:
+			events |= np.any(woi > manager.relocation_thresholds, axis=1)
+		quiet = int(np.argmax(events)) if np.any(events) else count
+		hotspot = bool(np.any(manager.placement.nominal_load > manager.utilization_set_points))
+		if manager.strategy == 'sandpiper':
+			quiet = self.sandpiper_quiet(pm_loads, hotspot, quiet)
+		if quiet == 0:
+			return 0
+
+		for s in range(0, quiet):
+			manager.time_index = t + s
+			manager.physical_load_vector = pm_loads[s]
+			manager.loads = loads[s]
+			manager.integrated_overload_index[:] = ioi[s]
+			manager.window_overload_index[:] = woi[s]
+			if manager.strategy == 'sandpiper':
+				manager.sandpiper.update(pm_loads[s])
+				manager.sandpiper.record(hotspot)
+			manager.log()
+		# the last step is measured again from the fleet, as a per-step one
+		manager.overload_time += np.count_nonzero(pm_loads[0:quiet-1] > manager.pm_cores)
+		self.source.commit(t, quiet, loads[quiet-1])
+		manager.gather(t + quiet - 1)
+		manager.refresh_indexes()
+		window[...] = windows[quiet-1]
+		manager.physical_load_error = errors[quiet-1]
+		return quiet
+
+	def sandpiper_quiet(self, pm_loads, hotspot, count):
+		# steps before the first sandpiper trigger, on a copy of the detector
+		manager = self.manager
+		probe = copy.deepcopy(manager.sandpiper)
+		for s in range(0, count):
+			forecast = probe.update(pm_loads[s])
+			probe.record(hotspot)
+			if probe.triggered(forecast, manager.utilization_set_points):
+				return s
+		return count
@@ -0,0 +1,65 @@
+import numpy as np
+
+# migration weight of the strategies, per migration of a vm
+weights = {'migration_likelihood': 10, 'migration_likelihood_woi': 1}
+
+class LikelihoodScore:
+	# Scores of the migration likelihood strategies, lowest first:
+	#   -1/c * (vm volume + free volume of its host) + c * weight * migrations
+	# with c the plan coefficient of the vm. The plan terms never change and
+	# the migration term only changes with a migration of the vm, so both are
+	# kept per vm. A decision pass (begin) scores the vms of the overloaded
+	# pms in one vectorized pass; later moves of the pass only change the free
+	# volume of their source and destination, so best() and top() score
+	# again the candidates whose host free volume changed, and no others.
+
+	def __init__(self, fleet, weight):
+		self.weight = weight
+		self.refresh(fleet)
+
+	def refresh(self, fleet):
+		# after a new fleet or restored migration counts
+		self.inverse = -1.0 / fleet.plan_coefficients
+		self.penalty_weight = fleet.plan_coefficients * self.weight
+		self.penalty = self.penalty_weight * fleet.migrations
+		self.vms = np.zeros(0, dtype=np.intp)
+
+	def moved(self, vm, migrations):
+		self.penalty[vm] = self.penalty_weight[vm] * migrations
+
+	def begin(self, vms, volumes, free_volume):
+		# candidates of a pass: sorted vm indexes, and the free volume of their hosts
+		self.vms = vms
+		self.volumes = volumes[vms]
+		self.free_volume = free_volume
+		self.scores = self.inverse[vms] * (self.volumes + free_volume) + self.penalty[vms]
+
+	def update(self, hosts, free_volume_keys):
+		free_volume = free_volume_keys[hosts]
+		changed = np.flatnonzero(free_volume != self.free_volume)
+		if len(changed) > 0:
+			self.free_volume[changed] = free_volume[changed]
+			vms = self.vms[changed]
+			self.scores[changed] = self.inverse[vms] * (self.volumes[changed] + \
+				free_volume[changed]) + self.penalty[vms]
+
+	def top(self, k, hosts, sources, free_volume_keys):
+		# the k best candidates on a pm of sources, best first, ties to the
+		# lowest vm index; hosts: current hosts of the candidates
+		self.update(hosts, free_volume_keys)
+		valid = np.flatnonzero(sources[hosts])
+		scores = self.scores[valid]
+		if k == 1 and len(valid) > 0:
+			# candidates are sorted by vm, argmin keeps the first of ties
+			return self.vms[valid[np.argmin(scores)]][np.newaxis]
+		if k < len(valid):
+			# every candidate tied with the k-th one, then the exact order
+			keep = scores <= np.partition(scores, k - 1)[k - 1]
+			valid = valid[keep]
+			scores = scores[keep]
+		order = np.lexsort((self.vms[valid], scores))[0:k]
+		return self.vms[valid[order]]
+
+	def best(self, hosts, sources, free_volume_keys):
+		vms = self.top(1, hosts, sources, free_volume_keys)
+		return int(vms[0]) if len(vms) > 0 else None
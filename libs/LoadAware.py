@@ -0,0 +1,18 @@
+import numpy as np
+
+def best_pair(source, vms, vm_volumes, free_volume_index):
+	# Pick the (vm, destination) pair that leaves the most free volume on the
+	# destination, over the vms hosted on source and every other pm. A pair is
+	# only feasible if the vm fits in the destination free volume. Ties go to
+	# the lowest vm index, then to the lowest pm index.
+	# Returns None when no vm of the source fits anywhere.
+	if len(vms) == 0:
+		return None
+	# for every vm the best destination is the pm with the most free volume,
+	# and the best vm the smallest one; none fits if it does not
+	volumes = vm_volumes[vms]
+	row = np.argmin(volumes)
+	destination = free_volume_index.best(exclude=source, limit=volumes[row])
+	if destination is None:
+		return None
+	return vms[row], destination
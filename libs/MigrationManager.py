@@ -1,314 +1,335 @@
 import numpy as np
-import random
-import logging
+import libs.Placement as Placement
+import libs.Trace as Trace
+import libs.VMFleet as VMFleet
+import libs.LoadAware as LoadAware
+import libs.Likelihood as Likelihood
+import libs.DestinationIndex as DestinationIndex
+import libs.Seeding as Seeding
+import libs.Sandpiper as Sandpiper
+
+def update_overload_indexes(load, set_points, ioi, window, woi):
+	# Integrated and window overload indexes, updated in place. The arrays are
+	# per pm, optionally with leading dimensions (replicas) before the pm one.
+	error = load - set_points
+	error_normalized = np.divide(error, load)
+	ioi += np.maximum(0, error_normalized)
+	window[..., 1:] = window[..., 0:-1]
+	window[..., 0] = error
+	woi[...] = np.sum(window, axis=-1)
+	return error
+
+def normalize_set_points(load, cores, set_points):
+	# spread the total load over the pms proportionally to their cores, in place
+	padding = 1.1
+	capacity_sum = np.sum(cores)
+	rescaling = np.divide(cores, capacity_sum)
+	set_points[...] = np.sum(load, axis=-1, keepdims=True) * padding * rescaling
+	np.minimum(set_points, cores, out=set_points)
+	np.maximum(set_points, 1.0, out=set_points)
 
 class MigrationManager:
 
 	def __init__(self, outdir, strategy, physical_machines, virtual_machines,
 		normalization_period, target_utilization=0.75, target_relocation=1.1,
-		window_size = 10):
-		random.seed(100) # set the random nymber generator to a fixed sequence
+		window_size = 10, migration_budget=1, pm_migration_budget=1, trace=None, seed=100, replica=0,
+		initial_placement=None, shard=None):
+		self.random = Seeding.strategy_generator(seed, strategy, replica, shard) # fixed sequence of migration decisions
 		self.strategy = strategy
-		# setup loggers
-		self.setup_logger('PMloads', outdir, r'PMloads.csv')
-		self.PMloads = logging.getLogger('PMloads')
-		self.setup_logger('PMsetpoints', outdir, r'PMsetpoints.csv')
-		self.PMsetpoints = logging.getLogger('PMsetpoints')
-		self.setup_logger('PMrelocationthresholds', outdir, r'PMrelocationthresholds.csv')
-		self.PMrelocationthresholds = logging.getLogger('PMrelocationthresholds')
-		self.setup_logger('PMioi', outdir, r'PMioi.csv')
-		self.PMioi = logging.getLogger('PMioi')
-		self.setup_logger('PMwoi', outdir, r'PMwoi.csv')
-		self.PMwoi = logging.getLogger('PMwoi')
-		self.setup_logger('VMmigrations', outdir, r'VMmigrations.csv')
-		self.VMmigrations = logging.getLogger('VMmigrations')
-		self.setup_logger('VMloads', outdir, r'VMloads.csv')
-		self.VMloads = logging.getLogger('VMloads')
-		self.setup_logger('MMmigrations', outdir, r'MMmigrations.csv')
-		self.MMmigrations = logging.getLogger('MMmigrations')
-		# end setup loggers
+		if trace is None:
+			trace = Trace.CSVTraceSink(outdir)
+		self.trace = trace
 		np.seterr('ignore')
+		self.time_index = -1 # last executed step
 		self.total_migrations = 0
+		self.overload_time = 0 # pm-steps with a load above the pm cores
 		self.pms = physical_machines
-		self.vms = virtual_machines
+		if isinstance(virtual_machines, VMFleet.VMFleet):
+			self.fleet = virtual_machines
+		else:
+			self.fleet = VMFleet.VMFleet.from_virtual_machines(virtual_machines, seed, replica)
 		self.num_pms = len(self.pms)
-		self.num_vms = len(self.vms)
+		self.num_vms = len(self.fleet)
 		self.normalization_period = normalization_period
+		self.migration_budget = migration_budget # moves planned per step
+		self.pm_migration_budget = pm_migration_budget # moves out of one pm per step
 		if self.num_pms < 1:
 			print("[MM]: Error, define at least one physical machine")
 			exit(-1)
-		self.location = np.zeros((self.num_vms, self.num_pms))
-		self.location[:,0] = 1 # initial placement: all on pm0
-		[x.place_on_pm(0) for x in self.vms] # redundant
-		self.utilization_set_points = np.array([x.get_cores() for x in self.pms])
+		self.pm_cores = np.array([x.get_cores() for x in self.pms], dtype=float)
+		self.pm_memory = np.array([x.get_memory() for x in self.pms], dtype=float)
+		self.pm_volumes = np.array([x.get_volume() for x in self.pms], dtype=float)
+		if initial_placement is None:
+			self.fleet.hosts[:] = 0 # initial placement: all on pm0
+		else:
+			self.fleet.hosts[:] = initial_placement
+		self.placement = Placement.Placement(self.num_pms, self.fleet.hosts, \
+			self.fleet.load_nominal, self.fleet.memory_nominal)
+		# destination candidates, best first
+		self.load_index = DestinationIndex.DestinationIndex(self.placement.load, 'min')
+		self.free_volume_index = DestinationIndex.DestinationIndex(self.pm_volumes - self.placement.volume, 'max')
+		self.sandpiper_index = DestinationIndex.DestinationIndex(self.sandpiper_volumes(), 'min')
+		self.utilization_set_points = self.pm_cores.copy()
 		self.utilization_set_points *= target_utilization # 0.75 or parameter
-		self.relocation_thresholds = np.array([x.get_cores() for x in self.pms])
+		self.relocation_thresholds = self.pm_cores.copy()
 		self.relocation_thresholds *= target_relocation # 1.1 or parameter
 		self.integrated_overload_index = np.zeros(self.num_pms)
 		self.window_overload_matrix = np.zeros((self.num_pms, window_size))
 		self.window_overload_index = np.zeros(self.num_pms)
-		# sandpiper
-		self.sandpiper_n = 5
-		self.sandpiper_k = 3
-		self.sandpiper_migrate = np.zeros(self.sandpiper_n)
-		self.muloads = np.zeros(self.num_pms)
-		self.sumx = np.zeros(self.num_pms)
-		self.sumx2 = np.zeros(self.num_pms)
-		self.sigmaloads = np.zeros(self.num_pms)
-
-	def setup_logger(self, logger_name, outdir, log_file, level=logging.INFO):
-		l = logging.getLogger(logger_name)
-		formatter = logging.Formatter('%(message)s') # %(asctime)s : 
-		fileHandler = logging.FileHandler(outdir+'/'+log_file, mode='w')
-		fileHandler.setFormatter(formatter)
-		l.setLevel(level)
-		l.addHandler(fileHandler)
+		self.sandpiper = Sandpiper.Sandpiper(self.num_pms, n=5, k=3)
+		self.likelihood = None
+		if strategy in Likelihood.weights:
+			self.likelihood = Likelihood.LikelihoodScore(self.fleet, Likelihood.weights[strategy])
 
 	def execute(self, time_index):
+		self.measure(time_index)
+		self.decide()
+		self.log()
+		self.normalize()
+
+	def measure(self, time_index):
+		self.gather(time_index)
+		self.refresh_indexes()
+		self.update_overload()
+
+	def gather(self, time_index):
 		self.time_index = time_index
-		self.loads = np.array([x.get_actual_load() for x in self.vms])
-		self.volumes = np.array([x.get_volume_actual() for x in self.vms])
-		self.total_load = np.sum(self.loads)
-		self.physical_load_matrix = self.location.transpose() * self.loads
-		self.physical_load_vector = np.sum(self.physical_load_matrix, axis=1)
-		self.physical_volume_matrix = self.location.transpose() * self.volumes
-		self.physical_volume_vector = np.sum(self.physical_volume_matrix, axis=1)
-		self.physical_load_error = self.physical_load_vector - self.utilization_set_points
-		self.physical_load_error_normalized = np.divide(self.physical_load_error, self.physical_load_vector)
-		integration = np.maximum(np.zeros((1, self.num_pms)), self.physical_load_error_normalized)
-		self.integrated_overload_index = self.integrated_overload_index + integration
-		self.window_overload_matrix[:,1:] = self.window_overload_matrix[:,0:-1]
-		self.window_overload_matrix[:,0] = self.physical_load_error
-		self.window_overload_index = np.sum(self.window_overload_matrix, axis=1)
-		
+		self.loads = self.fleet.load_actual
+		self.volumes = self.fleet.volume_actual
+		self.placement.refresh(self.loads, self.volumes)
+		# snapshot of the measured loads, the placement aggregates follow migrations
+		self.physical_load_vector = self.placement.load.copy()
+		self.physical_volume_vector = self.placement.volume.copy()
+		self.overload_time += np.count_nonzero(self.physical_load_vector > self.pm_cores)
+
+	def update_overload(self):
+		self.physical_load_error = update_overload_indexes(self.physical_load_vector, \
+			self.utilization_set_points, self.integrated_overload_index, \
+			self.window_overload_matrix, self.window_overload_index)
+
+	def refresh_indexes(self):
+		self.load_index.refresh(self.placement.load)
+		self.free_volume_index.refresh(self.pm_volumes - self.placement.volume)
+
+	def decide(self):
 		# select migration strategy
 		if self.strategy == 'random':
 			self.decide_migration_random()
 		elif self.strategy == 'load_aware':
-			self.decide_migration_loadaware()
+			self.decide_migration_loadaware(self.integrated_overload_index)
 		elif self.strategy == 'load_aware_woi':
-			self.decide_migration_loadaware_woi()
+			self.decide_migration_loadaware(self.window_overload_index)
 		elif self.strategy == 'migration_likelihood':
-			self.decide_migration_migrationlikelihood()
+			self.decide_migration_migrationlikelihood(self.integrated_overload_index)
 		elif self.strategy == 'migration_likelihood_woi':
-			self.decide_migration_migrationlikelihood_woi()
+			self.decide_migration_migrationlikelihood(self.window_overload_index)
 		elif self.strategy == 'sandpiper':
 			self.decide_migration_sandpiper()
 
-		self.log()
-
+	def normalize(self):
 		# select if load normalization active
 		if (self.normalization_period != 0):
-			if time_index % self.normalization_period == 0:
-				padding = 1.1
-				capacities = np.array([float(x.get_cores()) for x in self.pms])
-				capacity_sum = np.sum(capacities)
-				rescaling = np.divide(capacities, capacity_sum) 
-				self.utilization_set_points = np.sum(self.physical_load_vector) * padding * rescaling
-				self.utilization_set_points = np.minimum(self.utilization_set_points, np.array([x.get_cores() for x in self.pms]))
-				self.utilization_set_points = np.maximum(self.utilization_set_points, np.ones(self.num_pms))
+			if self.time_index % self.normalization_period == 0:
+				normalize_set_points(self.physical_load_vector, self.pm_cores, \
+					self.utilization_set_points)
 
 	def log(self):
-		self.PMloads.info('%s', ', '.join(map(str, list(self.physical_load_vector))))
-		self.PMsetpoints.info('%s', ', '.join(map(str, list(self.utilization_set_points))))
-		self.PMrelocationthresholds.info('%s', ', '.join(map(str, list(self.relocation_thresholds))))
-		self.PMioi.info('%s', ', '.join(map(str, self.integrated_overload_index[0].tolist())))
-		self.PMwoi.info('%s', ', '.join(map(str, list(self.window_overload_index))))
-		self.VMloads.info('%s', ', '.join(map(str, list(self.loads))))
-		self.VMmigrations.info('%s', ', '.join(map(str, [x.get_migrations() for x in self.vms])))	
+		self.trace.record('PMloads', self.physical_load_vector)
+		self.trace.record('PMsetpoints', self.utilization_set_points)
+		self.trace.record('PMrelocationthresholds', self.relocation_thresholds)
+		self.trace.record('PMioi', self.integrated_overload_index)
+		self.trace.record('PMwoi', self.window_overload_index)
+		self.trace.record('VMloads', self.loads)
+		self.trace.record('VMmigrations', self.fleet.migrations)
+
+	def close(self):
+		self.trace.close()
+
+	def summary(self):
+		return {'total_migrations': self.total_migrations, \
+			'overload_time': int(self.overload_time), \
+			'steps': self.time_index + 1}
+
+	def get_state(self):
+		# everything a run carries from one step to the next, as named arrays
+		state = {'time_index': np.array(self.time_index), \
+			'total_migrations': np.array(self.total_migrations), \
+			'overload_time': np.array(self.overload_time), \
+			'utilization_set_points': self.utilization_set_points.copy(), \
+			'relocation_thresholds': self.relocation_thresholds.copy(), \
+			'integrated_overload_index': self.integrated_overload_index.copy(), \
+			'window_overload_matrix': self.window_overload_matrix.copy(), \
+			'window_overload_index': self.window_overload_index.copy(), \
+			'nominal_load': self.placement.nominal_load.copy(), \
+			'nominal_memory': self.placement.nominal_memory.copy(), \
+			'random.' + self.strategy: Seeding.get_state(self.random)}
+		for prefix, component in (('fleet.', self.fleet), ('sandpiper.', self.sandpiper)):
+			for name, value in component.get_state().items():
+				state[prefix + name] = value
+		return state
+
+	def set_state(self, state):
+		# Restores get_state(), possibly saved by a run of another strategy:
+		# the decisions of a strategy only continue its own random stream.
+		if state['utilization_set_points'].shape != (self.num_pms,) or \
+			state['fleet.hosts'].shape != (self.num_vms,) or \
+			state['window_overload_matrix'].shape != self.window_overload_matrix.shape:
+			print("[MM]: The saved state is not of this data center")
+			exit(-1)
+		self.time_index = int(state['time_index'])
+		self.total_migrations = int(state['total_migrations'])
+		self.overload_time = int(state['overload_time'])
+		for name in ('utilization_set_points', 'relocation_thresholds', \
+			'integrated_overload_index', 'window_overload_matrix', 'window_overload_index'):
+			getattr(self, name)[...] = state[name]
+		if 'random.' + self.strategy in state:
+			Seeding.set_state(self.random, state['random.' + self.strategy])
+		for prefix, component in (('fleet.', self.fleet), ('sandpiper.', self.sandpiper)):
+			component.set_state(dict((x[len(prefix):], state[x]) for x in state if x.startswith(prefix)))
+		self.placement = Placement.Placement(self.num_pms, self.fleet.hosts, \
+			self.fleet.load_nominal, self.fleet.memory_nominal)
+		# saved rather than summed again, they follow the migrations incrementally
+		self.placement.nominal_load[:] = state['nominal_load']
+		self.placement.nominal_memory[:] = state['nominal_memory']
+		self.sandpiper_index.refresh(self.sandpiper_volumes())
+		if self.likelihood is not None:
+			self.likelihood.refresh(self.fleet)
+
+	def replace_fleet(self, fleet):
+		# continues with another set of vms on the same pms, between two
+		# steps (vms moved in or out of a shard); the pm state is kept
+		self.fleet = fleet
+		self.num_vms = len(fleet)
+		self.placement = Placement.Placement(self.num_pms, self.fleet.hosts, \
+			self.fleet.load_nominal, self.fleet.memory_nominal)
+		self.sandpiper_index.refresh(self.sandpiper_volumes())
+		if self.likelihood is not None:
+			self.likelihood.refresh(fleet)
 
 	def migrate(self, vm, source, destination):
 		self.total_migrations += 1
-		self.location[vm, source] = 0
-		self.location[vm, destination] = 1
-		self.vms[vm].perform_migration(self.pms[destination])
-		self.vms[vm].place_on_pm(destination)
-		self.MMmigrations.info('%s, %s, %s, %s, %s'%
-			(format(self.total_migrations, '04'),
-			format(self.time_index, '04'), \
-			format(vm, '02'), \
-			format(source, '02'), \
-			format(destination, '02')))
+		self.placement.move(vm, source, destination)
+		for pm in (source, destination):
+			self.load_index.update(pm, self.placement.load[pm])
+			self.free_volume_index.update(pm, self.pm_volumes[pm] - self.placement.volume[pm])
+			self.sandpiper_index.update(pm, self.sandpiper_volumes(pm))
+		self.fleet.perform_migration(vm, self.pm_cores[destination], self.pm_memory[destination])
+		if self.likelihood is not None:
+			self.likelihood.moved(vm, self.fleet.migrations[vm])
+		self.trace.event('MMmigrations', \
+			(self.total_migrations, self.time_index, vm, source, destination))
 		# print("[%s at time %s] vm %d (migrated %s times) from %d to %d"%
 		# 	(format(self.total_migrations, '04'), \
 		# 		format(self.time_index, '04'), \
-		# 		vm, format(self.vms[vm].migrations, '03'), source, destination))
+		# 		vm, format(self.fleet.migrations[vm], '03'), source, destination))
 
-	def decide_migration_random(self):
-		migrate_me_maybe = (self.integrated_overload_index > self.relocation_thresholds)[0]
-		if np.sum(migrate_me_maybe) > 0:
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			pm_source = random.choice(indexes)
-			set_of_vms = (self.location[:, pm_source] == 1).transpose()
-			vm_set_migration = np.array(np.where(set_of_vms)).tolist()[0]
-			vm_migrate = random.choice(vm_set_migration)
-			# avoiding to select the source machine as destination by using nan
-			saving_load_pm_source = self.physical_load_vector[pm_source]
-			self.physical_load_vector[pm_source] = np.nan
-			pm_destination = np.nanargmin(self.physical_load_vector)
-			self.physical_load_vector[pm_source] = saving_load_pm_source
+	def plan_migrations(self, migrate_me_maybe, plan_migration):
+		# Plan up to migration_budget moves out of the pms flagged in
+		# migrate_me_maybe, at most pm_migration_budget out of each of them.
+		# plan_migration(sources) proposes a (vm, source, destination)
+		# move, with vm None when that source has nothing to offer, or returns
+		# None when no move is possible at all. Every move updates the live
+		# aggregates and destination indexes, so the capacity it takes on the
+		# destination is reserved for the next ones, and a pm that received a
+		# vm is not used as a source again in the same pass.
+		sources = np.array(migrate_me_maybe, dtype=bool)
+		moves_out = np.zeros(self.num_pms, dtype=int)
+		planned = 0
+		for attempt in range(0, self.migration_budget):
+			if not np.any(sources):
+				break
+			move = plan_migration(sources)
+			if move is None:
+				break
+			vm_migrate, pm_source, pm_destination = move
+			if vm_migrate is None:
+				sources[pm_source] = False
+				continue
 			self.migrate(vm_migrate, pm_source, pm_destination)
-			self.integrated_overload_index[0,pm_source] = 0
-
-	def decide_migration_sandpiper(self):
-		epsilon = 0.001
-		# ar predictor
-		self.muloads = np.divide(self.muloads * self.time_index + self.physical_load_vector, self.time_index+1)
-		self.sumx += self.physical_load_vector
-		self.sumx2 += (self.physical_load_vector)**2
-		second_term = (np.multiply(self.sumx,self.sumx) / self.time_index)
-		if self.time_index>1:
-			self.sigmaloads = (self.sumx2 - second_term) / (self.time_index-1)
-		y = self.muloads + self.sigmaloads * (self.physical_load_vector - self.muloads)
-
-		migrate_me_maybe = np.zeros(self.num_pms)
-		for i in range(0, self.num_pms):
-			vms_in = (self.location[:, i] == 1).transpose()
-			vm_set_in = np.array(np.where(vms_in)).tolist()[0]
-			nominal_loads = [self.vms[vm_set_in[x]].get_nominal_load() for x in range(0,len(vm_set_in))]
-			migrate_me_maybe[i] = (np.sum(nominal_loads) > self.utilization_set_points[i])
-		self.sandpiper_migrate[1:self.sandpiper_n-1] = self.sandpiper_migrate[0:self.sandpiper_n-2]
-		if np.sum(migrate_me_maybe) > 0:
-			self.sandpiper_migrate[0] = int(1)
-		else:
-			self.sandpiper_migrate[0] = int(0)
-		is_y_more = y > self.utilization_set_points
-		if np.sum(self.sandpiper_migrate) >= self.sandpiper_k and np.any(is_y_more):
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			pm_source = random.choice(indexes)
-			set_of_vms = (self.location[:, pm_source] == 1).transpose()
-			vm_set_migration = np.array(np.where(set_of_vms)).tolist()[0]
-			volume_to_size_ratio = [self.vms[x].get_volume_to_size_ratio() for x in vm_set_migration]
-			vm_migrate = vm_set_migration[np.nanargmax(volume_to_size_ratio)]
-
-			sandpiper_core_comp = np.zeros(self.num_pms)
-			sandpiper_mem_comp = np.zeros(self.num_pms)
-			volume_pm_sandpiper = np.zeros(self.num_pms)
-			for i in range(0, self.num_pms):
-				vms_in = (self.location[:, i] == 1).transpose()
-				vm_set_in = np.array(np.where(vms_in)).tolist()[0]
-				nominal_loads = [self.vms[vm_set_in[x]].get_nominal_load() for x in range(0,len(vm_set_in))]
-				nominal_memories = [self.vms[vm_set_in[x]].get_nominal_memory() for x in range(0,len(vm_set_in))]
-				sandpiper_core_comp[i] = float(self.pms[i].get_cores()) / \
-				  max(float(self.pms[i].get_cores()) - sum(nominal_loads), epsilon)
-				sandpiper_mem_comp[i] = float(self.pms[i].get_memory()) / \
-				  max(float(self.pms[i].get_memory()) - sum(nominal_memories), epsilon)
-				volume_pm_sandpiper[i] = sandpiper_core_comp[i] * sandpiper_mem_comp[i]
+			self.integrated_overload_index[pm_source] = 0
+			planned += 1
+			moves_out[pm_source] += 1
+			if moves_out[pm_source] >= self.pm_migration_budget:
+				sources[pm_source] = False
+			sources[pm_destination] = False
+		return planned
 
-			pm_destination = np.nanargmin(volume_pm_sandpiper)
-			self.migrate(vm_migrate, pm_source, pm_destination)
-			self.integrated_overload_index[0,pm_source] = 0
-			self.sandpiper_migrate = np.zeros(self.sandpiper_n)
+	def decide_migration_random(self):
+		migrate_me_maybe = self.integrated_overload_index > self.relocation_thresholds
+		self.plan_migrations(migrate_me_maybe, self.plan_migration_random)
 
-	def decide_migration_loadaware(self):
-		migrate_me_maybe = (self.integrated_overload_index > self.relocation_thresholds)[0]
-		if np.sum(migrate_me_maybe) > 0:
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			pm_source = random.choice(indexes)
-			set_of_vms = (self.location[:, pm_source] == 1).transpose()
-			vm_set_migration = np.array(np.where(set_of_vms)).tolist()[0]
+	def plan_migration_random(self, sources):
+		indexes = np.flatnonzero(sources).tolist() # potential migration sources
+		pm_source = Seeding.choice(self.random, indexes)
+		vm_set_migration = self.placement.get_vms(pm_source)
+		if len(vm_set_migration) == 0:
+			return None, pm_source, None
+		vm_migrate = Seeding.choice(self.random, vm_set_migration)
+		pm_destination = self.load_index.best(exclude=pm_source)
+		if pm_destination is None:
+			return None
+		return vm_migrate, pm_source, pm_destination
 
-			volumes = np.array([x.get_volume() for x in self.pms])
-			available_volume_per_pm = volumes - self.physical_volume_vector
-			aware_matrix = np.zeros((self.num_vms, self.num_pms))
-			for col in range(0,self.num_pms):
-				aware_matrix[:, col] = available_volume_per_pm[col]
-			for row in range(0,self.num_vms):
-				if row in vm_set_migration:
-					vol_to_remove = self.volumes[row]
-				else:
-					vol_to_remove = np.inf
-				aware_matrix[row, :] = aware_matrix[row, :] - vol_to_remove
-			aware_matrix[:, pm_source] = np.nan
-			aware_matrix[aware_matrix<0] = np.nan
+	def sandpiper_volumes(self, pms=slice(None)):
+		epsilon = 0.001
+		sandpiper_core_comp = self.pm_cores[pms] / \
+		  np.maximum(self.pm_cores[pms] - self.placement.nominal_load[pms], epsilon)
+		sandpiper_mem_comp = self.pm_memory[pms] / \
+		  np.maximum(self.pm_memory[pms] - self.placement.nominal_memory[pms], epsilon)
+		return sandpiper_core_comp * sandpiper_mem_comp
 
-			if not np.isnan(aware_matrix).all():
-				argmaxidx = np.nanargmax(aware_matrix)
-				coordinates = np.unravel_index(argmaxidx, (self.num_vms, self.num_pms))
-				vm_migrate = coordinates[0]
-				pm_destination = coordinates[1]
-				self.migrate(vm_migrate, pm_source, pm_destination)
-				self.integrated_overload_index[0,pm_source] = 0
+	def decide_migration_sandpiper(self):
+		forecast = self.sandpiper.update(self.physical_load_vector) # ar predictor
+		migrate_me_maybe = self.placement.nominal_load > self.utilization_set_points
+		self.sandpiper.record(np.any(migrate_me_maybe))
+		if self.sandpiper.triggered(forecast, self.utilization_set_points):
+			if self.plan_migrations(migrate_me_maybe, self.plan_migration_sandpiper) > 0:
+				self.sandpiper.reset()
 
-	def decide_migration_loadaware_woi(self):
-		migrate_me_maybe = (self.window_overload_index > self.relocation_thresholds)[0]
-		if np.sum(migrate_me_maybe) > 0:
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			pm_source = random.choice(indexes)
-			set_of_vms = (self.location[:, pm_source] == 1).transpose()
-			vm_set_migration = np.array(np.where(set_of_vms)).tolist()[0]
+	def plan_migration_sandpiper(self, sources):
+		indexes = np.flatnonzero(sources).tolist() # potential migration sources
+		pm_source = Seeding.choice(self.random, indexes)
+		vm_set_migration = self.placement.get_vms(pm_source)
+		if len(vm_set_migration) == 0:
+			return None, pm_source, None
+		volume_to_size_ratio = self.fleet.get_volume_to_size_ratio(vm_set_migration)
+		vm_migrate = vm_set_migration[np.nanargmax(volume_to_size_ratio)]
+		pm_destination = self.sandpiper_index.best()
+		return vm_migrate, pm_source, pm_destination
 
-			volumes = np.array([x.get_volume() for x in self.pms])
-			available_volume_per_pm = volumes - self.physical_volume_vector
-			aware_matrix = np.zeros((self.num_vms, self.num_pms))
-			for col in range(0,self.num_pms):
-				aware_matrix[:, col] = available_volume_per_pm[col]
-			for row in range(0,self.num_vms):
-				if row in vm_set_migration:
-					vol_to_remove = self.volumes[row]
-				else:
-					vol_to_remove = np.inf
-				aware_matrix[row, :] = aware_matrix[row, :] - vol_to_remove
-			aware_matrix[:, pm_source] = np.nan
-			aware_matrix[aware_matrix<0] = np.nan
+	def decide_migration_loadaware(self, overload_index):
+		migrate_me_maybe = overload_index > self.relocation_thresholds
+		self.plan_migrations(migrate_me_maybe, self.plan_migration_loadaware)
 
-			if not np.isnan(aware_matrix).all():
-				argmaxidx = np.nanargmax(aware_matrix)
-				coordinates = np.unravel_index(argmaxidx, (self.num_vms, self.num_pms))
-				vm_migrate = coordinates[0]
-				pm_destination = coordinates[1]
-				self.migrate(vm_migrate, pm_source, pm_destination)
-				self.integrated_overload_index[0,pm_source] = 0
+	def plan_migration_loadaware(self, sources):
+		indexes = np.flatnonzero(sources).tolist() # potential migration sources
+		pm_source = Seeding.choice(self.random, indexes)
+		vm_set_migration = np.array(self.placement.get_vms(pm_source), dtype=np.intp)
+		decision = LoadAware.best_pair(pm_source, vm_set_migration, \
+			self.volumes, self.free_volume_index)
+		if decision is None:
+			return None, pm_source, None
+		vm_migrate, pm_destination = decision
+		return vm_migrate, pm_source, pm_destination
 
-	def decide_migration_migrationlikelihood(self):
-		migrate_me_maybe = (self.integrated_overload_index > self.relocation_thresholds)[0]
-		if np.sum(migrate_me_maybe) > 0:
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			set_of_vms = list()
-			for i in indexes:
-				partial = (self.location[:, i] == 1).transpose()
-				newly_found = np.array(np.where(partial)).tolist()
-				set_of_vms += newly_found[0]
-			set_of_vms = sorted(set_of_vms)
-			pms = [x.get_pm() for x in self.vms]
-			pm_volumes = np.array([x.get_volume() for x in self.pms])
-			vm_volumes = np.array([x.get_volume_actual() for x in self.vms])
-			vm_migrations = np.array([x.get_migrations() for x in self.vms])
-			available_volume_per_pm = pm_volumes - self.physical_volume_vector
-			available_capacity = [available_volume_per_pm[x.get_pm()] for x in self.vms]
-			plan_coefficients = np.array([x.plan.get_coefficient() for x in self.vms])
-			minimize_me = -1.0/plan_coefficients * (vm_volumes + available_capacity) + plan_coefficients * 10*vm_migrations
-			vm_migrate = np.nanargmin(minimize_me)
-			pm_source = self.vms[vm_migrate].get_pm()
-			# avoiding to select the source machine as destination by using nan
-			available_volume_per_pm[pm_source] = np.nan
-			pm_destination = np.nanargmax(available_volume_per_pm)
-			self.migrate(vm_migrate, pm_source, pm_destination)
-			self.integrated_overload_index[0,pm_source] = 0
+	def decide_migration_migrationlikelihood(self, overload_index):
+		migrate_me_maybe = overload_index > self.relocation_thresholds
+		if not np.any(migrate_me_maybe):
+			return
+		# only the vms of the overloaded pms are candidates, scored once per pass
+		vms = np.flatnonzero(migrate_me_maybe[self.placement.hosts])
+		self.likelihood.begin(vms, self.volumes, \
+			self.free_volume_index.keys[self.placement.hosts[vms]])
+		self.plan_migrations(migrate_me_maybe, self.plan_migration_migrationlikelihood)
 
-	def decide_migration_migrationlikelihood_woi(self):
-		migrate_me_maybe = (self.window_overload_index > self.relocation_thresholds)[0]
-		if np.sum(migrate_me_maybe) > 0:
-			indexes = np.array(np.where(migrate_me_maybe)).tolist()[0] # potential migration sources
-			set_of_vms = list()
-			for i in indexes:
-				partial = (self.location[:, i] == 1).transpose()
-				newly_found = np.array(np.where(partial)).tolist()
-				set_of_vms += newly_found[0]
-			set_of_vms = sorted(set_of_vms)
-			pms = [x.get_pm() for x in self.vms]
-			pm_volumes = np.array([x.get_volume() for x in self.pms])
-			vm_volumes = np.array([x.get_volume_actual() for x in self.vms])
-			vm_migrations = np.array([x.get_migrations() for x in self.vms])
-			available_volume_per_pm = pm_volumes - self.physical_volume_vector
-			available_capacity = [available_volume_per_pm[x.get_pm()] for x in self.vms]
-			plan_coefficients = np.array([x.plan.get_coefficient() for x in self.vms])
-			minimize_me = -1.0/plan_coefficients * (vm_volumes + available_capacity) + plan_coefficients * vm_migrations
-			vm_migrate = np.nanargmin(minimize_me)
-			pm_source = self.vms[vm_migrate].get_pm()
-			# avoiding to select the source machine as destination by using nan
-			available_volume_per_pm[pm_source] = np.nan
-			pm_destination = np.nanargmax(available_volume_per_pm)
-			self.migrate(vm_migrate, pm_source, pm_destination)
-			self.integrated_overload_index[0,pm_source] = 0
-			
\ No newline at end of file
+	def plan_migration_migrationlikelihood(self, sources):
+		likelihood = self.likelihood
+		vm_migrate = likelihood.best(self.placement.hosts[likelihood.vms], sources, \
+			self.free_volume_index.keys)
+		if vm_migrate is None:
+			return None
+		pm_source = self.placement.get_pm(vm_migrate)
+		pm_destination = self.free_volume_index.best(exclude=pm_source)
+		if pm_destination is None:
+			return None
+		return vm_migrate, pm_source, pm_destination
@@ -0,0 +1,55 @@
+import numpy as np
+
+class Placement:
+
+	def __init__(self, num_pms, hosts, nominal_loads, nominal_memories):
+		self.num_pms = num_pms
+		self.hosts = np.asarray(hosts, dtype=np.intp) # vm index -> pm index, shared with the fleet
+		self.num_vms = len(self.hosts)
+		# per-pm membership, kept in sync with hosts
+		self.members = [set() for i in range(0, self.num_pms)]
+		for vm, pm in enumerate(self.hosts.tolist()):
+			self.members[pm].add(vm)
+		# per-pm nominal aggregates, only change on migrations
+		self.vm_nominal_loads = np.array(nominal_loads, dtype=float)
+		self.vm_nominal_memories = np.array(nominal_memories, dtype=float)
+		self.nominal_load = self.aggregate(self.vm_nominal_loads)
+		self.nominal_memory = self.aggregate(self.vm_nominal_memories)
+		# per-pm actual aggregates, refreshed every step
+		self.vm_loads = np.zeros(self.num_vms)
+		self.vm_volumes = np.zeros(self.num_vms)
+		self.load = np.zeros(self.num_pms)
+		self.volume = np.zeros(self.num_pms)
+
+	def get_pm(self, vm):
+		return self.hosts[vm]
+
+	def get_vms(self, pm):
+		# sorted, so that choices over the set do not depend on insertion order
+		return sorted(self.members[pm])
+
+	def count_vms(self, pm):
+		return len(self.members[pm])
+
+	def move(self, vm, source, destination):
+		self.members[source].discard(vm)
+		self.members[destination].add(vm)
+		self.hosts[vm] = destination
+		self.nominal_load[source] -= self.vm_nominal_loads[vm]
+		self.nominal_load[destination] += self.vm_nominal_loads[vm]
+		self.nominal_memory[source] -= self.vm_nominal_memories[vm]
+		self.nominal_memory[destination] += self.vm_nominal_memories[vm]
+		self.load[source] -= self.vm_loads[vm]
+		self.load[destination] += self.vm_loads[vm]
+		self.volume[source] -= self.vm_volumes[vm]
+		self.volume[destination] += self.vm_volumes[vm]
+
+	def refresh(self, loads, volumes):
+		self.vm_loads = loads
+		self.vm_volumes = volumes
+		self.load = self.aggregate(loads)
+		self.volume = self.aggregate(volumes)
+
+	def aggregate(self, values):
+		# per-pm sum of a per-vm quantity
+		return np.bincount(self.hosts, weights=values, minlength=self.num_pms)
@@ -2,6 +2,7 @@ import sys
 
 class Plan:
 	plan_types = {'gold': 1, 'silver': 2, 'bronze': 3, 'basic': 4}
+	plan_coefficients = {'gold': 2.0, 'silver': 1.5, 'bronze': 1.2, 'basic': 1.0}
 
 	def __init__(self, plan='basic'):
 		if plan in self.plan_types:
@@ -10,12 +11,8 @@ class Plan:
 			print("[Plan]: %s, unavailable"%plan)
 			exit(-1)
 	
+	def get_type(self):
+		return self.plan_types[self.plan]
+
 	def get_coefficient(self):
-		if self.plan == 'gold':
-			return 2.0
-		elif self.plan == 'silver':
-			return 1.5
-		elif self.plan == 'bronze':
-			return 1.2
-		else:
-			return 1.0
\ No newline at end of file
+		return self.plan_coefficients[self.plan]
\ No newline at end of file
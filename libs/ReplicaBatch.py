@@ -0,0 +1,123 @@
+import numpy as np
+import math
+import libs.MigrationManager as MigrationManager
+import libs.Seeding as Seeding
+import libs.Trace as Trace
+
+# strategies triggered by the integrated or by the window overload index
+ioi_strategies = ('random', 'load_aware', 'migration_likelihood')
+woi_strategies = ('load_aware_woi', 'migration_likelihood_woi')
+
+class ReplicaBatch:
+	# Independent replicas of one data center, advanced in
+	# lockstep. Per-pm aggregates, overload indexes and set points carry a
+	# leading replica dimension and are updated for all replicas with one set
+	# of array operations; the MigrationManager of each replica works on its
+	# row of those arrays and is only asked to decide when its replica has a
+	# pm over the relocation threshold (sandpiper keeps per-step state and
+	# decides every step). The loads of all replicas are one (replicas, vms)
+	# draw of the stacked counter based streams. Replica r evolves exactly
+	# like a serial run with the same seed and replica index replicas[r].
+
+	def __init__(self, strategy, physical_machines, fleet, normalization_period, \
+		seed, replicas, target_utilization=0.75, target_relocation=1.1, window_size=10, \
+		migration_budget=1, pm_migration_budget=1, initial_placement=None):
+		self.strategy = strategy
+		self.seed = seed
+		self.replicas = list(replicas)
+		self.num_replicas = len(self.replicas)
+		self.normalization_period = normalization_period
+		self.fleets, self.state = fleet.replicate(seed, self.replicas)
+		self.streams = Seeding.LoadStreams.stack([x.streams for x in self.fleets])
+		self.managers = list()
+		for fleet_r, replica in zip(self.fleets, self.replicas):
+			self.managers.append(MigrationManager.MigrationManager(None, strategy, \
+				physical_machines, fleet_r, normalization_period, \
+				target_utilization=target_utilization, target_relocation=target_relocation, \
+				window_size=window_size, migration_budget=migration_budget, \
+				pm_migration_budget=pm_migration_budget, \
+				trace=Trace.CSVTraceSink(None, ()), seed=seed, replica=replica, \
+				initial_placement=initial_placement))
+		first = self.managers[0]
+		self.num_pms = first.num_pms
+		self.num_vms = first.num_vms
+		self.pm_cores = first.pm_cores
+		self.pm_volumes = first.pm_volumes
+		shape = (self.num_replicas, self.num_pms)
+		self.load = np.zeros(shape) # measured at the start of the step
+		self.volume = np.zeros(shape)
+		self.live_load = np.zeros(shape) # follows the migrations of the step
+		self.live_volume = np.zeros(shape)
+		self.set_points = np.repeat(first.utilization_set_points[np.newaxis, :], self.num_replicas, axis=0)
+		self.thresholds = np.repeat(first.relocation_thresholds[np.newaxis, :], self.num_replicas, axis=0)
+		self.ioi = np.zeros(shape)
+		self.window = np.zeros(shape + (window_size,))
+		self.woi = np.zeros(shape)
+		self.overload_time = np.zeros(self.num_replicas, dtype=np.int64)
+		# bins of pm j of replica r in the flattened per-pm arrays
+		self.offsets = (np.arange(self.num_replicas) * self.num_pms)[:, np.newaxis]
+		for r, manager in enumerate(self.managers):
+			self.bind(r, manager)
+
+	def bind(self, r, manager):
+		# point the manager state at row r of the batch arrays
+		manager.loads = self.fleets[r].load_actual
+		manager.volumes = self.fleets[r].volume_actual
+		manager.placement.vm_loads = manager.loads
+		manager.placement.vm_volumes = manager.volumes
+		manager.placement.load = self.live_load[r]
+		manager.placement.volume = self.live_volume[r]
+		manager.physical_load_vector = self.load[r]
+		manager.physical_volume_vector = self.volume[r]
+		manager.utilization_set_points = self.set_points[r]
+		manager.relocation_thresholds = self.thresholds[r]
+		manager.integrated_overload_index = self.ioi[r]
+		manager.window_overload_matrix = self.window[r]
+		manager.window_overload_index = self.woi[r]
+
+	def aggregate(self, values):
+		bins = (self.state['hosts'] + self.offsets).ravel()
+		totals = np.bincount(bins, weights=values.ravel(), minlength=self.num_replicas*self.num_pms)
+		return totals.reshape(self.num_replicas, self.num_pms)
+
+	def execute(self, time_index):
+		self.fleets[0].execute_replicas(self.state, self.streams)
+		self.load[...] = self.aggregate(self.state['load_actual'])
+		self.volume[...] = self.aggregate(self.state['volume_actual'])
+		self.live_load[...] = self.load
+		self.live_volume[...] = self.volume
+		self.overload_time += np.count_nonzero(self.load > self.pm_cores, axis=1)
+		MigrationManager.update_overload_indexes(self.load, self.set_points, \
+			self.ioi, self.window, self.woi)
+
+		if self.strategy in ioi_strategies:
+			deciding = np.flatnonzero(np.any(self.ioi > self.thresholds, axis=1))
+		elif self.strategy in woi_strategies:
+			deciding = np.flatnonzero(np.any(self.woi > self.thresholds, axis=1))
+		else:
+			deciding = range(0, self.num_replicas)
+		for r in deciding:
+			manager = self.managers[r]
+			manager.time_index = time_index
+			manager.refresh_indexes()
+			manager.decide()
+
+		if self.normalization_period != 0 and time_index % self.normalization_period == 0:
+			MigrationManager.normalize_set_points(self.load, self.pm_cores, self.set_points)
+
+	def summaries(self, steps):
+		rows = list()
+		for r, manager in enumerate(self.managers):
+			rows.append({'replica': self.replicas[r], \
+				'total_migrations': manager.total_migrations, \
+				'overload_time': int(self.overload_time[r]), \
+				'steps': steps})
+		return rows
+
+def confidence_interval(values, z=1.96):
+	# mean and half width of the normal approximation interval (95% by default)
+	values = np.asarray(values, dtype=float)
+	mean = np.mean(values)
+	if len(values) < 2:
+		return mean, float('nan')
+	return mean, z * np.std(values, ddof=1) / math.sqrt(len(values))
@@ -0,0 +1,57 @@
+import numpy as np
+
+class Sandpiper:
+	# Hotspot detection of the sandpiper strategy for all pms at once.
+	# A step is a hotspot step when some pm has a nominal load above its set
+	# point; migrations are considered when k of the last steps were hotspot
+	# steps and the ar forecast of some pm is above its set point. The history
+	# is a bit ring, bit 0 being the current step; like the original shift of
+	# an n entries array, it holds the last n-1 steps. The load moments are
+	# kept as a running mean and sum of squared deviations (Welford), so they
+	# do not lose precision on long runs.
+
+	def __init__(self, num_pms, n=5, k=3):
+		self.n = n
+		self.k = k
+		self.mask = (1 << (n - 1)) - 1
+		self.history = 0
+		self.samples = 0
+		self.mean = np.zeros(num_pms)
+		self.m2 = np.zeros(num_pms)
+		self.coefficient = np.zeros(num_pms)
+		self.delta = np.zeros(num_pms)
+
+	def update(self, load):
+		# adds the loads of a step, returns the ar forecast of the next one
+		self.samples += 1
+		np.subtract(load, self.mean, out=self.delta)
+		self.mean += self.delta / self.samples
+		self.m2 += self.delta * (load - self.mean)
+		t = self.samples - 1 # index of the step
+		if t > 1:
+			# (sum x^2 - (sum x)^2 / t) / (t - 1) over the t + 1 samples so far
+			self.coefficient = (self.m2 - self.mean * self.mean * (t + 1) / t) / (t - 1)
+		return self.mean + self.coefficient * (load - self.mean)
+
+	def record(self, hotspot):
+		self.history = ((self.history << 1) | int(hotspot)) & self.mask
+
+	def hotspot_steps(self):
+		return bin(self.history).count('1')
+
+	def triggered(self, forecast, set_points):
+		return self.hotspot_steps() >= self.k and bool(np.any(forecast > set_points))
+
+	def reset(self):
+		self.history = 0
+
+	def get_state(self):
+		return {'history': np.array(self.history), 'samples': np.array(self.samples), \
+			'mean': self.mean.copy(), 'm2': self.m2.copy(), 'coefficient': self.coefficient.copy()}
+
+	def set_state(self, state):
+		self.history = int(state['history'])
+		self.samples = int(state['samples'])
+		self.mean[:] = state['mean']
+		self.m2[:] = state['m2']
+		self.coefficient = state['coefficient'].copy()
@@ -0,0 +1,157 @@
+import numpy as np
+import json
+import os
+import libs.Plan as Plan
+import libs.VMFleet as VMFleet
+import libs.PhysicalMachine as PhysicalMachine
+import libs.Seeding as Seeding
+
+# A scenario describes a data center and the default parameters of its runs:
+#   pms: list of pm classes {count, cores, memory}
+#   vms: list of vm groups {count, plan, load, memory}; plan is a plan name
+#        or a mix {plan: weight}
+#   placement: initial placement policy, pm0 (every vm on the first pm),
+#        random or round_robin
+#   run: default arguments of Simulation.run (strategy, steps, ...)
+# count, cores, memory and load are a number or a distribution:
+#   {"choice": [values], "weights": [weights]}, {"uniform": [low, high]},
+#   {"integers": [low, high]} (inclusive), {"normal": [mean, deviation]},
+#   {"poisson": mean}, each with optional "min" and "max" clipping.
+# Values are drawn in bulk from the build stream of the seed, group by group
+# in file order, so a scenario and a seed always give the same data center.
+
+placements = ('pm0', 'random', 'round_robin')
+directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scenarios')
+
+def resolve(name):
+	# a scenario file, or the name of a bundled one (scenarios/<name>.json)
+	if os.path.exists(name):
+		return name
+	for extension in ('.json', '.toml', '.yaml', '.yml'):
+		path = os.path.join(directory, name + extension)
+		if os.path.exists(path):
+			return path
+	print("[Scenario]: No scenario %s"%name)
+	exit(-1)
+
+def load(name):
+	path = resolve(name)
+	if path.endswith('.json'):
+		with open(path) as f:
+			return json.load(f)
+	elif path.endswith('.toml'):
+		try:
+			import tomllib
+		except ImportError:
+			try:
+				import tomli as tomllib
+			except ImportError:
+				print("[Scenario]: Reading %s needs Python 3.11 or the tomli package"%path)
+				exit(-1)
+		with open(path, 'rb') as f:
+			return tomllib.load(f)
+	elif path.endswith('.yaml') or path.endswith('.yml'):
+		try:
+			import yaml
+		except ImportError:
+			print("[Scenario]: Reading %s needs the PyYAML package"%path)
+			exit(-1)
+		with open(path) as f:
+			return yaml.safe_load(f)
+	print("[Scenario]: Unsupported scenario format %s"%path)
+	exit(-1)
+
+def draw(spec, random, size):
+	# size values of a number or distribution spec
+	if isinstance(spec, (int, float)):
+		return np.full(size, float(spec))
+	if not isinstance(spec, dict):
+		print("[Scenario]: Unsupported value %r"%(spec,))
+		exit(-1)
+	if 'choice' in spec:
+		weights = spec.get('weights')
+		if weights is not None:
+			weights = np.array(weights, dtype=float) / np.sum(weights)
+		values = random.choice(np.array(spec['choice'], dtype=float), size=size, p=weights)
+	elif 'uniform' in spec:
+		values = random.uniform(spec['uniform'][0], spec['uniform'][1], size=size)
+	elif 'integers' in spec:
+		values = random.integers(spec['integers'][0], spec['integers'][1] + 1, size=size).astype(float)
+	elif 'normal' in spec:
+		values = random.normal(spec['normal'][0], spec['normal'][1], size=size)
+	elif 'poisson' in spec:
+		values = random.poisson(spec['poisson'], size=size).astype(float)
+	else:
+		print("[Scenario]: Unsupported distribution %r"%(spec,))
+		exit(-1)
+	if 'min' in spec or 'max' in spec:
+		values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+	return values
+
+def draw_count(spec, random):
+	count = int(round(draw(spec, random, 1)[0]))
+	if count < 0:
+		print("[Scenario]: Negative count %r"%(spec,))
+		exit(-1)
+	return count
+
+def draw_plans(spec, random, size):
+	names = sorted(Plan.Plan.plan_types)
+	if isinstance(spec, str):
+		spec = {spec: 1.0}
+	for name in spec:
+		if name not in Plan.Plan.plan_types:
+			print("[Scenario]: Unknown plan %s"%name)
+			exit(-1)
+	weights = np.array([spec.get(x, 0.0) for x in names], dtype=float)
+	if len(spec) == 1:
+		return np.full(size, names.index(list(spec)[0]))
+	return random.choice(len(names), size=size, p=weights / np.sum(weights))
+
+def build(scenario, seed=100, replica=0):
+	# Returns the physical machines, the fleet (with the load streams of
+	# replica) and the initial host of every vm. The fleet arrays are filled
+	# group by group, without per-vm objects.
+	random = Seeding.build_generator(seed)
+	cores = list()
+	memory = list()
+	for group in scenario['pms']:
+		count = draw_count(group.get('count', 1), random)
+		cores.append(draw(group.get('cores', 16), random, count))
+		memory.append(draw(group.get('memory', 100), random, count))
+	cores = np.concatenate(cores)
+	memory = np.concatenate(memory)
+	if len(cores) == 0:
+		print("[Scenario]: Define at least one physical machine")
+		exit(-1)
+	physical_machines = [PhysicalMachine.PhysicalMachine(x, y) for x, y in zip(cores.tolist(), memory.tolist())]
+
+	names = np.array(sorted(Plan.Plan.plan_types))
+	plans = list()
+	loads = list()
+	memories = list()
+	for group in scenario['vms']:
+		count = draw_count(group.get('count', 1), random)
+		plans.append(draw_plans(group.get('plan', 'basic'), random, count))
+		loads.append(draw(group.get('load', 4.0), random, count))
+		memories.append(draw(group.get('memory', 1.0), random, count))
+	plans = names[np.concatenate(plans).astype(np.intp)]
+	loads = np.concatenate(loads)
+	memories = np.concatenate(memories)
+	num_pms = len(physical_machines)
+	num_vms = len(loads)
+
+	placement = scenario.get('placement', 'pm0')
+	if placement == 'pm0':
+		hosts = np.zeros(num_vms, dtype=np.intp)
+	elif placement == 'random':
+		hosts = random.integers(num_pms, size=num_vms)
+	elif placement == 'round_robin':
+		hosts = np.arange(num_vms) % num_pms
+	else:
+		print("[Scenario]: Unsupported placement %s, use one of %s"%(placement, ' '.join(placements)))
+		exit(-1)
+
+	fleet = VMFleet.VMFleet(loads, memories, plans.tolist(), hosts, seed, replica)
+	fleet.compute_volume_sandpiper(np.arange(num_vms), cores[hosts], memory[hosts])
+	return physical_machines, fleet, hosts
@@ -0,0 +1,180 @@
+import numpy as np
+import copy
+import zlib
+
+# Every random stream of a run is a child of SeedSequence(seed), addressed
+# by a spawn key, so a stream only depends on the seed and on its key:
+#   (BUILD,)                         data center construction, shared by replicas
+#   (LOADS, replica)                 actual loads, one counter based stream per vm
+#   (STRATEGY, replica, strategy)    decisions of one migration strategy
+#   (STRATEGY, replica, strategy, shard)  decisions in one shard of a sharded run
+#   (TUNING, strategy)               configurations sampled by Tune.py
+# Streams never depend on the order in which objects are built, or on how
+# replicas are spread over processes or batches.
+BUILD = 0
+LOADS = 1
+STRATEGY = 2
+TUNING = 3
+
+def generator(seed, *key):
+	return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=key)))
+
+def build_generator(seed):
+	return generator(seed, BUILD)
+
+def strategy_generator(seed, strategy, replica=0, shard=None):
+	key = (STRATEGY, replica, zlib.crc32(strategy.encode('utf-8')))
+	if shard is not None:
+		key += (shard,)
+	return generator(seed, *key)
+
+def tuning_generator(seed, strategy):
+	return generator(seed, TUNING, zlib.crc32(strategy.encode('utf-8')))
+
+def choice(random, items):
+	# uniform pick from a sequence, keeping the item type
+	return items[random.integers(len(items))]
+
+class LoadStreams:
+	# One standard normal stream per vm, counter based: draw t of vm i only
+	# depends on the key of vm i and on t, so all vms are drawn with a few
+	# array operations and a stream has no state but its counter. The key of
+	# vm i is the SplitMix64 output i of the (LOADS, replica) SeedSequence
+	# entropy; draw t is the Box-Muller transform of outputs 2t+1 and 2t+2 of
+	# the SplitMix64 stream started at that key.
+
+	def __init__(self, seed, num_vms, replica=0, first=0):
+		# first: index of the first vm, the streams of vms first .. first+num_vms-1
+		self.seed = seed
+		self.replica = replica
+		root = np.random.SeedSequence(seed, spawn_key=(LOADS, replica)).generate_state(1, np.uint64)
+		with np.errstate(over='ignore'):
+			self.keys = mix64(root + np.arange(first + 1, first + num_vms + 1, dtype=np.uint64) * golden)
+		self.counters = np.zeros(num_vms, dtype=np.uint64)
+
+	# elements of normal() computed at a time, in place, so that a stacked
+	# (replicas, vms) draw does not stream its temporaries through memory
+	block = 8192
+
+	def normal(self, keys, counters):
+		keys, counters = np.broadcast_arrays(keys, counters)
+		values = np.empty(keys.shape)
+		keys, counters, out = keys.reshape(-1), counters.reshape(-1), values.reshape(-1)
+		size = max(1, min(self.block, len(out)))
+		z1 = np.empty(size, dtype=np.uint64)
+		z2 = np.empty(size, dtype=np.uint64)
+		work = np.empty(size, dtype=np.uint64)
+		u2 = np.empty(size)
+		with np.errstate(over='ignore'):
+			for start in range(0, len(out), size):
+				end = min(start + size, len(out))
+				count = end - start
+				a, b, t, v, u1 = z1[0:count], z2[0:count], work[0:count], u2[0:count], out[start:end]
+				np.multiply(counters[start:end], golden + golden, out=a)
+				a += keys[start:end]
+				np.add(a, golden + golden, out=b)
+				a += golden
+				mix64_inplace(a, t)
+				mix64_inplace(b, t)
+				uniform_into(a, u1)
+				uniform_into(b, v)
+				# Box-Muller, u1 becomes the value
+				np.log(u1, out=u1)
+				u1 *= -2.0
+				np.sqrt(u1, out=u1)
+				v *= 2.0 * np.pi
+				np.cos(v, out=v)
+				u1 *= v
+		return values
+
+	def standard_normal(self):
+		values = self.normal(self.keys, self.counters)
+		self.counters += np.uint64(1)
+		return values
+
+	def standard_normal_block(self, count):
+		# (count, vms) draws of the next count steps, without advancing
+		return self.normal(self.keys, self.counters + np.arange(0, count, dtype=np.uint64)[:, np.newaxis])
+
+	def skip(self, count):
+		self.counters += np.uint64(count)
+
+	def draw(self, vm):
+		# single draw for one vm, the next of its own stream
+		value = self.normal(self.keys[vm:vm+1], self.counters[vm:vm+1])[0]
+		self.counters[vm] += np.uint64(1)
+		return value
+
+	def take(self, vms):
+		# streams of the vms at indexes vms, continuing from their counters
+		streams = copy.copy(self)
+		streams.keys = self.keys[vms]
+		streams.counters = self.counters[vms]
+		return streams
+
+	@classmethod
+	def concatenate(cls, parts):
+		streams = copy.copy(parts[0])
+		streams.keys = np.concatenate([x.keys for x in parts])
+		streams.counters = np.concatenate([x.counters for x in parts])
+		return streams
+
+	@classmethod
+	def stack(cls, parts):
+		# streams of several replicas as (replicas, vms) keys and counters, all
+		# drawn at once by standard_normal(); the parts become views of the rows
+		streams = copy.copy(parts[0])
+		streams.keys = np.stack([x.keys for x in parts])
+		streams.counters = np.stack([x.counters for x in parts])
+		for i, x in enumerate(parts):
+			x.keys = streams.keys[i]
+			x.counters = streams.counters[i]
+		return streams
+
+	def get_state(self):
+		return {'counters': self.counters.copy()}
+
+	def set_state(self, state):
+		self.counters[:] = state['counters']
+
+golden = np.uint64(0x9E3779B97F4A7C15)
+
+def mix64(z):
+	# SplitMix64 output function, on uint64 arrays (wrapping arithmetic)
+	with np.errstate(over='ignore'):
+		z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+		z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+	return z ^ (z >> np.uint64(31))
+
+def mix64_inplace(z, work):
+	# mix64 of z into z, work: uint64 scratch of the same shape
+	for shift, factor in ((30, 0xBF58476D1CE4E5B9), (27, 0x94D049BB133111EB), (31, None)):
+		np.right_shift(z, np.uint64(shift), out=work)
+		z ^= work
+		if factor is not None:
+			z *= np.uint64(factor)
+
+def uniform_into(z, out):
+	# uniform(z) into the float array out, z is overwritten
+	z >>= np.uint64(11)
+	np.add(z, 0.5, out=out)
+	out *= 1.0 / (1 << 53)
+
+def uniform(z):
+	# uint64 to a double in (0, 1), from the 53 high bits
+	return ((z >> np.uint64(11)).astype(float) + 0.5) * (1.0 / (1 << 53))
+
+def get_state(random):
+	# generator state as six uint64: state and increment (high, low), cached half word
+	state = random.bit_generator.state
+	values = [state['state']['state'], state['state']['inc']]
+	words = list()
+	for x in values:
+		words += [x >> 64, x & ((1 << 64) - 1)]
+	return np.array(words + [state['has_uint32'], state['uinteger']], dtype=np.uint64)
+
+def set_state(random, words):
+	words = [int(x) for x in words]
+	random.bit_generator.state = {'bit_generator': 'PCG64', \
+		'state': {'state': (words[0] << 64) | words[1], 'inc': (words[2] << 64) | words[3]}, \
+		'has_uint32': words[4], 'uinteger': words[5]}
@@ -0,0 +1,296 @@
+import numpy as np
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+import libs.MigrationManager as MigrationManager
+import libs.VMFleet as VMFleet
+import libs.Trace as Trace
+
+# Sharded runs: the pms are split in contiguous shards (clusters, racks),
+# each run by its own MigrationManager in a worker process, so that local
+# migrations of all shards run in parallel. Every exchange_every steps the
+# coordinator reads the per-pm loads the shards published in shared memory,
+# sums them per shard, and moves vms from shards above the utilization set
+# point to shards below it. Only the shard aggregates and the moved vms
+# (with their state and load streams) go through the pipes. A vm keeps its
+# load stream wherever it runs, and the shards advance in lockstep, so a
+# sharded run does not depend on process scheduling.
+
+def partition(num_pms, shards):
+	# first pm of every shard, and num_pms
+	if shards < 1 or shards > num_pms:
+		print("[Sharding]: Between 1 and %d shards, not %d"%(num_pms, shards))
+		exit(-1)
+	return (np.arange(0, shards + 1) * num_pms) // shards
+
+class ShardSink:
+	# trace sink of a shard, writing global vm and pm indexes in migration events
+
+	def __init__(self, sink, shard):
+		self.sink = sink
+		self.shard = shard
+
+	def event(self, name, values):
+		count, step, vm, source, destination = values
+		self.sink.event(name, (count, step, int(self.shard.vms[vm]), \
+			source + self.shard.first, destination + self.shard.first))
+
+	def __getattr__(self, name):
+		return getattr(self.sink, name)
+
+class Shard:
+	# one shard, in its worker process; vms maps the local vm indexes of the
+	# fleet to global ones
+
+	def __init__(self, index, first, physical_machines, fleet, vms, outdir, strategy, \
+		normalization_period, seed, replica, params, trace_format, trace_series, shared, shard):
+		# shard: key of the decision stream, None for the stream of a flat run
+		self.index = index
+		self.first = first
+		self.vms = vms
+		num_pms = len(physical_machines)
+		sink = Trace.open_sink(trace_format, outdir, trace_series)
+		self.manager = MigrationManager.MigrationManager(outdir, strategy, \
+			physical_machines, fleet, normalization_period, trace=ShardSink(sink, self), \
+			seed=seed, replica=replica, initial_placement=fleet.hosts, shard=shard, **params)
+		self.published_load = np.ndarray((num_pms,), buffer=shared.buf, offset=8*first)
+
+	def run(self, first_step, last_step):
+		manager = self.manager
+		for i in range(first_step, last_step + 1):
+			manager.fleet.execute()
+			manager.execute(i)
+		self.published_load[:] = manager.physical_load_vector
+
+	def export(self, budget, shed):
+		# Up to budget vms, and about shed cores of load, leave the shard: the
+		# most loaded vm of the most loaded pm, again and again.
+		manager = self.manager
+		fleet = manager.fleet
+		load = manager.placement.load.copy()
+		leaving = list()
+		shed_so_far = 0.0
+		while len(leaving) < budget and shed_so_far < shed:
+			pm = int(np.argmax(load))
+			candidates = [x for x in manager.placement.get_vms(pm) if x not in leaving]
+			if len(candidates) == 0:
+				break
+			vm = candidates[int(np.argmax(fleet.load_actual[candidates]))]
+			leaving.append(vm)
+			load[pm] -= fleet.load_actual[vm]
+			shed_so_far += fleet.load_actual[vm]
+		leaving = np.array(sorted(leaving), dtype=np.intp)
+		staying = np.setdiff1d(np.arange(0, len(fleet)), leaving)
+		moving = fleet.take(leaving)
+		sources = fleet.hosts[leaving] + self.first
+		vms = self.vms[leaving]
+		self.replace(fleet.take(staying), self.vms[staying])
+		return moving, vms, sources
+
+	def receive(self, moving, vms):
+		# the vms that arrive go to the least utilized pms, one after the other
+		manager = self.manager
+		load = manager.placement.load.copy()
+		destinations = np.zeros(len(moving), dtype=np.intp)
+		for i in range(0, len(moving)):
+			pm = int(np.argmin(load / manager.pm_cores))
+			destinations[i] = pm
+			load[pm] += moving.load_actual[i]
+		moving.hosts[:] = destinations
+		moving.compute_volume_sandpiper(np.arange(0, len(moving)), \
+			manager.pm_cores[destinations], manager.pm_memory[destinations])
+		moving.migrations += 1
+		self.replace(VMFleet.VMFleet.concatenate([manager.fleet, moving]), \
+			np.concatenate([self.vms, vms]))
+		return destinations + self.first
+
+	def replace(self, fleet, vms):
+		self.vms = vms
+		self.manager.replace_fleet(fleet)
+
+	def close(self):
+		self.manager.close()
+		summary = self.manager.summary()
+		summary.update(shard=self.index, vms=len(self.vms))
+		return summary
+
+def guarded(function, *args):
+	# ('ok', result) of function, or ('error', reason) when it raised or
+	# went through one of the print and exit error paths
+	try:
+		return 'ok', function(*args)
+	except SystemExit as e:
+		return 'error', 'exit %s'%e.code
+	except Exception as e:
+		return 'error', repr(e)
+
+def serve(connection, *args):
+	# worker process of one shard, runs the commands of the coordinator
+	# (run, export, receive, close) and answers with guarded(); once the
+	# shard failed, every command gets its error until close
+	reply = guarded(Shard, *args)
+	shard = reply[1]
+	failed = reply if reply[0] == 'error' else None
+	while True:
+		message = connection.recv()
+		command = message[0]
+		if failed is None:
+			reply = guarded(getattr(shard, command), *message[1:])
+			if reply[0] == 'error':
+				failed = reply
+		connection.send(reply if failed is None else failed)
+		if command == 'close':
+			connection.close()
+			return
+
+class Coordinator:
+
+	def __init__(self, outdir, shards, strategy, physical_machines, fleet, \
+		normalization_period, seed=100, replica=0, exchange_every=10, cross_budget=1, \
+		trace_format='csv', trace_series=None, target_utilization=0.75, **params):
+		# fleet.hosts: initial placement; params: other MigrationManager parameters.
+		# Shard s writes its series to outdir/shard_<s>, with global indexes
+		# in the migration events; the per-vm series are left out, as the vms
+		# of a shard change.
+		self.outdir = outdir
+		self.exchange_every = exchange_every
+		self.cross_budget = cross_budget
+		self.target_utilization = target_utilization
+		self.num_pms = len(physical_machines)
+		self.bounds = partition(self.num_pms, shards)
+		self.pm_cores = np.array([x.get_cores() for x in physical_machines], dtype=float)
+		self.shard_cores = np.add.reduceat(self.pm_cores, self.bounds[:-1])
+		# measured pm loads of the last step run, written by the shards
+		self.shared = shared_memory.SharedMemory(create=True, size=8 * self.num_pms)
+		self.pm_load = np.ndarray((self.num_pms,), buffer=self.shared.buf)
+		series = tuple(x for x in Trace.parse_series(trace_series) if not x.startswith('VM'))
+		params = dict(params, target_utilization=target_utilization)
+		self.cross_migrations = 0
+		self.connections = list()
+		self.processes = list()
+		self.files = list()
+		try:
+			self.start(outdir, shards, strategy, physical_machines, fleet, \
+				normalization_period, seed, replica, params, trace_format, series)
+		except BaseException:
+			self.release()
+			raise
+
+	def start(self, outdir, shards, strategy, physical_machines, fleet, \
+		normalization_period, seed, replica, params, trace_format, series):
+		for s in range(0, shards):
+			first, last = int(self.bounds[s]), int(self.bounds[s+1])
+			vms = np.flatnonzero((fleet.hosts >= first) & (fleet.hosts < last))
+			part = fleet.take(vms)
+			part.hosts -= first
+			shard_outdir = os.path.join(outdir, 'shard_%d'%s)
+			os.makedirs(shard_outdir, exist_ok=True)
+			connection, child = multiprocessing.Pipe()
+			process = multiprocessing.Process(target=serve, args=(child, s, first, \
+				physical_machines[first:last], part, vms, shard_outdir, strategy, \
+				normalization_period, seed, replica, params, trace_format, series, self.shared, \
+				s if shards > 1 else None))
+			process.start()
+			child.close() # the worker holds the other end, its exit is an EOF here
+			self.connections.append(connection)
+			self.processes.append(process)
+		self.utilization_file = open(os.path.join(outdir, 'SHARDutilization.csv'), 'w')
+		self.files.append(self.utilization_file)
+		self.migrations_file = open(os.path.join(outdir, 'MMcrossmigrations.csv'), 'w')
+		self.files.append(self.migrations_file)
+
+	def broadcast(self, messages):
+		# one message per shard (None for none), then the answers; a failed
+		# shard stops the run, release() then stops the other workers
+		for s, (connection, message) in enumerate(zip(self.connections, messages)):
+			if message is not None:
+				try:
+					connection.send(message)
+				except OSError:
+					self.fail(s, message[0], 'worker process stopped')
+		answers = list()
+		for s, (connection, message) in enumerate(zip(self.connections, messages)):
+			if message is None:
+				answers.append(None)
+				continue
+			try:
+				status, value = connection.recv()
+			except (EOFError, OSError):
+				status, value = 'error', 'worker process stopped'
+			if status == 'error':
+				self.fail(s, message[0], value)
+			answers.append(value)
+		return answers
+
+	def fail(self, shard, command, reason):
+		print("[Sharding]: Shard %d failed on %s: %s"%(shard, command, reason))
+		exit(-1)
+
+	def run(self, steps):
+		step = 0
+		while step < steps:
+			last = steps - 1
+			if self.exchange_every > 0:
+				last = min(step + self.exchange_every, steps) - 1
+			self.broadcast([('run', step, last)] * len(self.connections))
+			if last < steps - 1:
+				self.exchange(last)
+			step = last + 1
+
+	def exchange(self, step):
+		# Pairs the most utilized shards above the set point with the least
+		# utilized ones below it; each donor sheds the load that would level
+		# the pair, within cross_budget vms.
+		load = np.add.reduceat(self.pm_load, self.bounds[:-1])
+		utilization = load / self.shard_cores
+		self.utilization_file.write(', '.join([str(step)] + [str(x) for x in utilization.tolist()]) + '\n')
+		order = np.argsort(-utilization, kind='stable').tolist()
+		donors = [x for x in order if utilization[x] > self.target_utilization]
+		receivers = [x for x in reversed(order) if utilization[x] < self.target_utilization]
+		pairs = list(zip(donors, receivers))
+		if len(pairs) == 0:
+			return
+		exports = [None] * len(self.connections)
+		for donor, receiver in pairs:
+			level = (load[donor] + load[receiver]) / (self.shard_cores[donor] + self.shard_cores[receiver])
+			exports[donor] = ('export', self.cross_budget, load[donor] - level * self.shard_cores[donor])
+		exported = self.broadcast(exports)
+		imports = [None] * len(self.connections)
+		for donor, receiver in pairs:
+			moving, vms, sources = exported[donor]
+			imports[receiver] = ('receive', moving, vms)
+		imported = self.broadcast(imports)
+		for donor, receiver in pairs:
+			moving, vms, sources = exported[donor]
+			for vm, source, destination in zip(vms.tolist(), sources.tolist(), imported[receiver].tolist()):
+				self.cross_migrations += 1
+				self.migrations_file.write(', '.join([format(self.cross_migrations, '04'), \
+					format(step, '04'), str(vm), str(source), str(destination), \
+					str(donor), str(receiver)]) + '\n')
+
+	def close(self):
+		summaries = self.broadcast([('close',)] * len(self.connections))
+		for process in self.processes:
+			process.join()
+		self.release()
+		return {'total_migrations': sum([x['total_migrations'] for x in summaries]) + self.cross_migrations, \
+			'cross_migrations': self.cross_migrations, \
+			'overload_time': sum([x['overload_time'] for x in summaries]), \
+			'steps': summaries[0]['steps'], 'shards': summaries}
+
+	def release(self):
+		# stops the workers still running, closes the files and frees the
+		# shared memory; after close() or a failure, more calls do nothing
+		for process in self.processes:
+			if process.is_alive():
+				process.terminate()
+			process.join()
+		for connection in self.connections:
+			connection.close()
+		for f in self.files:
+			f.close()
+		if self.shared is not None:
+			del self.pm_load
+			self.shared.close()
+			self.shared.unlink()
+			self.shared = None
@@ -0,0 +1,169 @@
+import numpy as np
+import asyncio
+import concurrent.futures
+import json
+import struct
+import time
+import libs.Workload as Workload
+
+# Load samples of a streaming controller, one frame per batch of steps:
+#   binary: header (magic, num_vms, num_series, num_steps, first step),
+#           then num_steps x num_series x num_vms float32, series load
+#           then memory, the record layout of a raw workload trace
+#   json:   one line {"step": first step, "load": [[...], ...],
+#           "memory": [[...], ...]} (memory optional, one row per step)
+# Decisions are json lines, one per migration, then a summary line.
+magic = b'VMLS'
+header = struct.Struct('<4sIIIQ')
+formats = ('binary', 'json')
+policies = ('coalesce', 'block')
+# longest json frame line read
+line_limit = 1 << 26
+
+def encode(form, step, load, memory=None):
+	# frame of the (steps, vms) load rows starting at step
+	load = np.asarray(load, dtype=np.float32)
+	if form == 'json':
+		frame = {'step': int(step), 'load': load.tolist()}
+		if memory is not None:
+			frame['memory'] = np.asarray(memory, dtype=np.float32).tolist()
+		return (json.dumps(frame) + '\n').encode('ascii')
+	series = [load] if memory is None else [load, np.asarray(memory, dtype=np.float32)]
+	data = np.stack(series, axis=1)
+	return header.pack(magic, load.shape[1], len(series), load.shape[0], step) + data.tobytes()
+
+async def read_frame(reader, form):
+	# (first step, load rows, memory rows or None), None at the end of the stream
+	if form == 'json':
+		line = await reader.readline()
+		if not line:
+			return None
+		frame = json.loads(line)
+		memory = frame.get('memory')
+		return frame['step'], np.array(frame['load'], dtype=np.float32, ndmin=2), \
+			None if memory is None else np.array(memory, dtype=np.float32, ndmin=2)
+	try:
+		data = await reader.readexactly(header.size)
+	except asyncio.IncompleteReadError as e:
+		if len(e.partial) == 0:
+			return None
+		raise
+	tag, num_vms, num_series, num_steps, step = header.unpack(data)
+	if tag != magic:
+		raise ValueError('not a load sample frame')
+	data = await reader.readexactly(4 * num_vms * num_series * num_steps)
+	rows = np.frombuffer(data, dtype='<f4').reshape(num_steps, num_series, num_vms)
+	return step, rows[:, 0, :], rows[:, 1, :] if num_series > 1 else None
+
+class DecisionSink:
+	# trace sink collecting the migrations of the current sample
+
+	def __init__(self, sink):
+		self.sink = sink
+		self.decisions = list()
+
+	def event(self, name, values):
+		if name == 'MMmigrations':
+			self.decisions.append(values)
+		self.sink.event(name, values)
+
+	def __getattr__(self, name):
+		return getattr(self.sink, name)
+
+class Controller:
+	# Runs a MigrationManager on live samples instead of a workload. A reader
+	# puts the steps of every frame in a bounded queue, and waits while it is
+	# full: the sender is then held back by the socket or pipe. The worker
+	# runs the manager in a thread, so frames keep arriving meanwhile; with
+	# the coalesce policy only the newest of the waiting samples is run, the
+	# older ones being stale. Samples not newer than the last step run are
+	# dropped. Every migration is emitted with its latency, from the arrival
+	# of the sample to the decision, and the time of the step computation.
+
+	def __init__(self, manager, form='binary', queue_size=64, policy='coalesce'):
+		self.manager = manager
+		self.form = form
+		self.queue_size = queue_size
+		self.policy = policy
+		manager.trace = DecisionSink(manager.trace)
+		# the numpy error state is per thread: the worker ignores floating
+		# point errors as MigrationManager sets it for its own thread
+		self.executor = concurrent.futures.ThreadPoolExecutor(1, initializer=np.seterr, initargs=('ignore',))
+		self.counters = {'frames': 0, 'samples': 0, 'steps': 0, 'coalesced': 0, \
+			'stale': 0, 'backpressure_waits': 0, 'max_queue': 0, 'decisions': 0}
+		self.latencies = list()
+
+	async def session(self, reader, emit):
+		# runs the samples of one stream, emit(decision) writes a decision dict
+		queue = asyncio.Queue(self.queue_size)
+		consumer = asyncio.ensure_future(self.consume(queue, emit))
+		try:
+			while True:
+				frame = await read_frame(reader, self.form)
+				if frame is None:
+					break
+				received = time.perf_counter()
+				step, load, memory = frame
+				if load.shape[1] < len(self.manager.fleet):
+					raise ValueError('a frame of %d virtual machines, the fleet has %d'% \
+						(load.shape[1], len(self.manager.fleet)))
+				self.counters['frames'] += 1
+				for i in range(0, load.shape[0]):
+					sample = (step + i, load[i], None if memory is None else memory[i], received)
+					self.counters['samples'] += 1
+					if queue.full():
+						self.counters['backpressure_waits'] += 1
+					await queue.put(sample)
+					self.counters['max_queue'] = max(self.counters['max_queue'], queue.qsize())
+		finally:
+			await queue.put(None)
+			await consumer
+
+	async def consume(self, queue, emit):
+		loop = asyncio.get_running_loop()
+		done = False
+		while not done:
+			samples = [await queue.get()]
+			while not queue.empty():
+				samples.append(queue.get_nowait())
+			if samples[-1] is None:
+				done = True
+				samples.pop()
+			if self.policy == 'coalesce' and len(samples) > 1:
+				self.counters['coalesced'] += len(samples) - 1
+				samples = samples[-1:]
+			for sample in samples:
+				if sample[0] <= self.manager.time_index:
+					self.counters['stale'] += 1
+					continue
+				decisions, compute = await loop.run_in_executor(self.executor, self.step, sample)
+				latency = time.perf_counter() - sample[3]
+				for count, step, vm, source, destination in decisions:
+					self.counters['decisions'] += 1
+					self.latencies.append(latency)
+					emit({'migration': count, 'step': step, 'vm': int(vm), 'source': int(source), \
+						'destination': int(destination), 'latency_ms': 1e3 * latency, \
+						'compute_ms': 1e3 * compute})
+
+	def step(self, sample):
+		step, load, memory, received = sample
+		start = time.perf_counter()
+		sink = self.manager.trace
+		sink.decisions = list()
+		Workload.assign(self.manager.fleet, load, memory)
+		self.manager.execute(step)
+		self.counters['steps'] += 1
+		return sink.decisions, time.perf_counter() - start
+
+	def summary(self):
+		summary = dict(self.counters)
+		summary.update(self.manager.summary())
+		if len(self.latencies) > 0:
+			latencies = np.array(self.latencies)
+			for name, q in (('p50', 50), ('p99', 99), ('max', 100)):
+				summary['latency_%s_ms'%name] = 1e3 * float(np.percentile(latencies, q))
+		return summary
+
+	def close(self):
+		self.executor.shutdown()
+		self.manager.close()
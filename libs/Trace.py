@@ -0,0 +1,191 @@
+import numpy as np
+import os
+import struct
+
+# per-step series, one row of values per step
+SERIES = ('PMloads', 'PMsetpoints', 'PMrelocationthresholds', 'PMioi', 'PMwoi', 'VMloads', 'VMmigrations')
+# event series, one row per event, fixed columns and csv field widths
+EVENTS = {'MMmigrations': ('04', '04', '02', '02', '02')}
+
+def parse_series(names):
+	# comma separated list of series, 'all' or None for every series
+	if names is None or names == 'all':
+		return SERIES + tuple(EVENTS)
+	if names == '' or names == 'none':
+		return ()
+	selected = tuple(x.strip() for x in names.split(','))
+	for name in selected:
+		if name not in SERIES and name not in EVENTS:
+			print("[Trace]: Unknown series %s"%name)
+			exit(-1)
+	return selected
+
+def open_sink(kind, outdir, series=None, resume=None):
+	# resume: offsets() of a previous sink on outdir, to continue its files
+	if kind == 'csv':
+		return CSVTraceSink(outdir, series, resume=resume)
+	elif kind == 'npy':
+		return NpyTraceSink(outdir, series, resume=resume)
+	print("[Trace]: Unsupported trace format %s"%kind)
+	exit(-1)
+
+class CSVTraceSink:
+	# text layout, one comma separated line per step (or event) and series
+
+	def __init__(self, outdir, series=None, buffering=1<<20, resume=None):
+		self.series = SERIES + tuple(EVENTS) if series is None else tuple(series)
+		self.files = dict()
+		for name in self.series:
+			path = os.path.join(outdir, name + '.csv')
+			if resume is not None and name in resume:
+				# drop what was written after the offset, then append
+				os.truncate(path, resume[name])
+				self.files[name] = open(path, 'a', buffering=buffering)
+			else:
+				self.files[name] = open(path, 'w', buffering=buffering)
+
+	def enabled(self, name):
+		return name in self.files
+
+	def record(self, name, values):
+		f = self.files.get(name)
+		if f is not None:
+			f.write(', '.join(map(str, values.tolist())))
+			f.write('\n')
+
+	def event(self, name, values):
+		f = self.files.get(name)
+		if f is not None:
+			f.write(', '.join([format(x, w) for x, w in zip(values, EVENTS[name])]))
+			f.write('\n')
+
+	def flush(self):
+		for f in self.files.values():
+			f.flush()
+
+	def offsets(self):
+		# bytes written to every series, after a flush
+		return dict((name, f.tell()) for name, f in self.files.items())
+
+	def close(self):
+		for f in self.files.values():
+			f.close()
+		self.files = dict()
+
+class NpyTraceSink:
+	# Columnar binary layout, one <series>.npy file per series holding a
+	# (rows, width) array. Rows are buffered in preallocated chunks of at
+	# most chunk_rows rows and chunk_bytes bytes (one row at least, so wide
+	# series of large fleets buffer few rows) and appended to the file when
+	# a chunk is full; the .npy header has a fixed
+	# size and is rewritten with the row count on every flush, so a flushed
+	# file can be opened with np.load(path, mmap_mode='r') at any time.
+	header_size = 128
+
+	def __init__(self, outdir, series=None, chunk_rows=1024, chunk_bytes=1<<22, resume=None):
+		self.series = SERIES + tuple(EVENTS) if series is None else tuple(series)
+		self.outdir = outdir
+		self.chunk_rows = chunk_rows
+		self.chunk_bytes = chunk_bytes
+		self.files = dict()
+		self.buffers = dict()
+		self.fill = dict()
+		self.rows = dict()
+		for name in self.series:
+			path = os.path.join(outdir, name + '.npy')
+			self.fill[name] = 0
+			self.rows[name] = 0
+			if name in EVENTS:
+				self.buffers[name] = self.allocate(len(EVENTS[name]), np.int64)
+			if resume is not None and name in resume:
+				# keep the first resume[name] rows, then append
+				self.files[name] = open(path, 'r+b')
+				np.lib.format.read_magic(self.files[name])
+				shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(self.files[name])
+				if shape[1] > 0:
+					self.buffers[name] = self.allocate(shape[1], dtype)
+				self.rows[name] = resume[name]
+				self.files[name].truncate(self.header_size + resume[name] * shape[1] * dtype.itemsize)
+			else:
+				self.files[name] = open(path, 'w+b')
+			self.write_header(name)
+
+	def enabled(self, name):
+		return name in self.files
+
+	def record(self, name, values):
+		if name not in self.files:
+			return
+		buffer = self.buffers.get(name)
+		if buffer is None:
+			# the first row fixes width and dtype of the series
+			values = np.asarray(values)
+			dtype = np.int64 if values.dtype.kind in 'iub' else np.float64
+			buffer = self.allocate(len(values), dtype)
+			self.buffers[name] = buffer
+		buffer[self.fill[name]] = values
+		self.fill[name] += 1
+		if self.fill[name] == buffer.shape[0]:
+			self.flush_series(name)
+
+	def allocate(self, width, dtype):
+		dtype = np.dtype(dtype)
+		rows = max(1, min(self.chunk_rows, self.chunk_bytes // max(1, width * dtype.itemsize)))
+		return np.zeros((rows, width), dtype=dtype)
+
+	def event(self, name, values):
+		self.record(name, values)
+
+	def write_header(self, name):
+		buffer = self.buffers.get(name)
+		dtype = buffer.dtype if buffer is not None else np.dtype(np.float64)
+		width = buffer.shape[1] if buffer is not None else 0
+		header = "{'descr': %r, 'fortran_order': False, 'shape': (%d, %d), }"% \
+			(np.lib.format.dtype_to_descr(dtype), self.rows[name], width)
+		header = header.ljust(self.header_size - 10 - 1) + '\n'
+		f = self.files[name]
+		f.seek(0)
+		f.write(np.lib.format.magic(1, 0))
+		f.write(struct.pack('<H', len(header)))
+		f.write(header.encode('latin1'))
+		f.seek(0, os.SEEK_END)
+
+	def flush_series(self, name):
+		fill = self.fill[name]
+		if fill > 0:
+			self.files[name].write(self.buffers[name][0:fill].tobytes())
+			self.rows[name] += fill
+			self.fill[name] = 0
+		self.write_header(name)
+		self.files[name].flush()
+
+	def flush(self):
+		for name in self.files:
+			self.flush_series(name)
+
+	def offsets(self):
+		# rows written to every series, after a flush
+		return dict(self.rows)
+
+	def close(self):
+		self.flush()
+		for f in self.files.values():
+			f.close()
+		self.files = dict()
+
+def npy_to_csv(indir, outdir, series=None):
+	# rewrite the .npy series of a run in the csv layout
+	if series is None:
+		series = SERIES + tuple(EVENTS)
+	selected = [x for x in series if os.path.exists(os.path.join(indir, x + '.npy'))]
+	sink = CSVTraceSink(outdir, selected)
+	for name in selected:
+		data = np.load(os.path.join(indir, name + '.npy'), mmap_mode='r')
+		for start in range(0, data.shape[0], 4096):
+			chunk = np.array(data[start:start+4096])
+			for row in chunk:
+				if name in EVENTS:
+					sink.event(name, row.tolist())
+				else:
+					sink.record(name, row)
+	sink.close()
@@ -0,0 +1,164 @@
+import numpy as np
+import math
+import copy
+import libs.Plan as Plan
+import libs.Seeding as Seeding
+
+class VMFleet:
+
+	def __init__(self, load_nominal, memory_nominal, plans, hosts=None, seed=100, replica=0, first=0):
+		self.num_vms = len(load_nominal)
+		self.load_nominal = np.array(load_nominal, dtype=float)
+		if np.any(self.load_nominal <= 0):
+			print("[VMFleet]: The virtual machines need to have a positive nominal load")
+			exit(-1)
+		self.memory_nominal = np.array(memory_nominal, dtype=float)
+		self.plan_types = np.array([Plan.Plan.plan_types[x] for x in plans], dtype=np.int8)
+		self.plan_coefficients = np.array([Plan.Plan.plan_coefficients[x] for x in plans])
+		self.volume_nominal = self.load_nominal * self.memory_nominal
+		self.volume_nominal_sandpiper = np.zeros(self.num_vms)
+		self.migrations = np.zeros(self.num_vms, dtype=np.int64)
+		if hosts is None:
+			hosts = np.zeros(self.num_vms)
+		self.hosts = np.array(hosts, dtype=np.intp) # shared with the placement
+		self.load_actual = np.zeros(self.num_vms)
+		self.memory_actual = np.zeros(self.num_vms)
+		self.volume_actual = np.zeros(self.num_vms)
+		self.load_mean = 0.75 * self.load_nominal
+		self.load_deviation = math.sqrt(0.25)
+		self.streams = Seeding.LoadStreams(seed, self.num_vms, replica, first) if seed is not None else None
+
+	@classmethod
+	def from_virtual_machines(cls, virtual_machines, seed=100, replica=0):
+		fleet = cls([x.get_nominal_load() for x in virtual_machines], \
+			[x.get_nominal_memory() for x in virtual_machines], \
+			[x.plan.plan for x in virtual_machines], \
+			[x.get_pm() for x in virtual_machines], seed, replica)
+		fleet.volume_nominal_sandpiper[:] = [x.get_volume_nominal('sandpiper') for x in virtual_machines]
+		fleet.migrations[:] = [x.get_migrations() for x in virtual_machines]
+		fleet.load_actual[:] = [x.get_actual_load() for x in virtual_machines]
+		fleet.memory_actual[:] = [x.memory_actual for x in virtual_machines]
+		fleet.volume_actual[:] = [x.get_volume_actual() for x in virtual_machines]
+		for i, x in enumerate(virtual_machines):
+			x.bind(fleet, i)
+		return fleet
+
+	# arrays that change during a run, one row per replica in a replicated fleet
+	replica_state = ('volume_nominal_sandpiper', 'migrations', 'hosts', \
+		'load_actual', 'memory_actual', 'volume_actual')
+
+	def replicate(self, seed, replicas):
+		# One copy of the fleet per replica index, with the load streams of
+		# that replica. The copies share the static arrays;
+		# the state of copy r is row r of (replicas, vms) arrays, also returned
+		# by name so that a replica batch can work on all rows at once.
+		state = dict()
+		for name in self.replica_state:
+			state[name] = np.repeat(getattr(self, name)[np.newaxis, :], len(replicas), axis=0)
+		fleets = list()
+		for r, replica in enumerate(replicas):
+			fleet = copy.copy(self)
+			for name in self.replica_state:
+				setattr(fleet, name, state[name][r])
+			fleet.streams = Seeding.LoadStreams(seed, self.num_vms, replica)
+			fleets.append(fleet)
+		return fleets, state
+
+	# every per-vm array, the ones above and the static ones
+	vm_arrays = ('load_nominal', 'memory_nominal', 'plan_types', 'plan_coefficients', \
+		'volume_nominal', 'load_mean') + replica_state
+
+	def take(self, vms):
+		# fleet of the vms at indexes vms, with their state and load streams
+		fleet = copy.copy(self)
+		fleet.num_vms = len(vms)
+		for name in self.vm_arrays:
+			setattr(fleet, name, getattr(self, name)[vms])
+		if self.streams is not None:
+			fleet.streams = self.streams.take(vms)
+		return fleet
+
+	@classmethod
+	def concatenate(cls, fleets):
+		fleet = copy.copy(fleets[0])
+		fleet.num_vms = sum([len(x) for x in fleets])
+		for name in cls.vm_arrays:
+			setattr(fleet, name, np.concatenate([getattr(x, name) for x in fleets]))
+		if fleet.streams is not None:
+			fleet.streams = Seeding.LoadStreams.concatenate([x.streams for x in fleets])
+		return fleet
+
+	def get_state(self):
+		state = dict()
+		for name in self.replica_state:
+			state[name] = getattr(self, name).copy()
+		if self.streams is not None:
+			for name, value in self.streams.get_state().items():
+				state['streams.' + name] = value
+		return state
+
+	def set_state(self, state):
+		# in place, the arrays are shared with the placement and the replicas
+		for name in self.replica_state:
+			getattr(self, name)[:] = state[name]
+		if self.streams is not None:
+			prefix = 'streams.'
+			self.streams.set_state(dict((x[len(prefix):], state[x]) for x in state if x.startswith(prefix)))
+
+	def __len__(self):
+		return self.num_vms
+
+	def execute(self):
+		# one step of the load stream of every vm
+		np.multiply(self.streams.standard_normal(), self.load_deviation, out=self.load_actual)
+		self.load_actual += self.load_mean
+		np.maximum(self.load_actual, 1e-2, out=self.load_actual)
+		self.memory_actual[:] = self.memory_nominal
+		np.multiply(self.load_actual, self.memory_actual, out=self.volume_actual)
+
+	def execute_replicas(self, state, streams):
+		# execute() of all the copies of replicate(), on their (replicas, vms)
+		# state arrays, with their streams stacked by LoadStreams.stack
+		load_actual = state['load_actual']
+		np.multiply(streams.standard_normal(), self.load_deviation, out=load_actual)
+		load_actual += self.load_mean
+		np.maximum(load_actual, 1e-2, out=load_actual)
+		state['memory_actual'][...] = self.memory_nominal
+		np.multiply(load_actual, state['memory_actual'], out=state['volume_actual'])
+
+	def load_block(self, count):
+		# actual loads of the next count steps, as rows, without advancing the
+		# streams; row t is the load_actual of the t-th next execute()
+		load = self.streams.standard_normal_block(count)
+		load *= self.load_deviation
+		load += self.load_mean
+		np.maximum(load, 1e-2, out=load)
+		return load
+
+	def skip(self, count, load):
+		# the state after count steps of execute(), the last of them with load
+		self.streams.skip(count)
+		self.load_actual[:] = load
+		self.memory_actual[:] = self.memory_nominal
+		np.multiply(self.load_actual, self.memory_actual, out=self.volume_actual)
+
+	def execute_vm(self, vm):
+		load_actual = max(self.load_mean[vm] + self.load_deviation * self.streams.draw(vm), 1e-2)
+		self.load_actual[vm] = load_actual
+		self.memory_actual[vm] = self.memory_nominal[vm]
+		self.volume_actual[vm] = load_actual * self.memory_nominal[vm]
+
+	def compute_volume_sandpiper(self, vms, cores, memory):
+		epsilon = 0.001
+		saturated_diff_cpu = np.maximum(cores - self.load_nominal[vms], epsilon)
+		saturated_diff_mem = np.maximum(memory - self.memory_nominal[vms], epsilon)
+		self.volume_nominal_sandpiper[vms] = \
+		  cores / saturated_diff_cpu * \
+		  memory / saturated_diff_mem
+
+	def perform_migration(self, vm, cores, memory):
+		self.compute_volume_sandpiper(vm, cores, memory)
+		self.migrations[vm] += 1
+
+	def get_volume_to_size_ratio(self, vms):
+		return self.volume_nominal_sandpiper[vms] / self.memory_nominal[vms]
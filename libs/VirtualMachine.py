@@ -1,42 +1,73 @@
 import libs.Plan as Plan
-import random
-import math
+import libs.VMFleet as VMFleet
 
 class VirtualMachine:
+	# thin view onto one row of a VMFleet; a standalone virtual machine
+	# owns a fleet of one until VMFleet.from_virtual_machines rebinds it.
+	# It draws the load stream of vm index of the seed, and without an index
+	# it has no load stream until it is part of a fleet
 
-	def __init__(self, pm_initial, plan='basic', load_nominal=4.0, memory_nominal = 1.0):
-		random.seed(100) # set the random nymber generator to a fixed sequence
-		if load_nominal > 0:
-			self.load_nominal = load_nominal
-		else:
+	def __init__(self, pm_initial, plan='basic', load_nominal=4.0, memory_nominal = 1.0, \
+		index=None, seed=100, replica=0):
+		if load_nominal <= 0:
 			print("[VM]: The virtual machine needs to have a positive nominal load")
 			exit(-1)
 		self.plan = Plan.Plan(plan)
-		self.memory_nominal = memory_nominal
-		self.memory_actual = 0
-		self.load_actual = 0
-		self.migrations = 0
-		self.pm_id = 0
-		self.volume_nominal = load_nominal * memory_nominal
-		self.volume_actual = 0
-		self.volume_nominal_sandpiper = 0
+		if index is None:
+			seed = None
+			index = 0
+		self.bind(VMFleet.VMFleet([load_nominal], [memory_nominal], [plan], None, seed, replica, index), 0)
 		self.compute_volume_sandpiper(pm_initial)
 
+	def bind(self, fleet, index):
+		self.fleet = fleet
+		self.index = index
+
+	@property
+	def load_nominal(self):
+		return self.fleet.load_nominal[self.index]
+
+	@property
+	def memory_nominal(self):
+		return self.fleet.memory_nominal[self.index]
+
+	@property
+	def volume_nominal(self):
+		return self.fleet.volume_nominal[self.index]
+
+	@property
+	def volume_nominal_sandpiper(self):
+		return self.fleet.volume_nominal_sandpiper[self.index]
+
+	@property
+	def load_actual(self):
+		return self.fleet.load_actual[self.index]
+
+	@property
+	def memory_actual(self):
+		return self.fleet.memory_actual[self.index]
+
+	@property
+	def volume_actual(self):
+		return self.fleet.volume_actual[self.index]
+
+	@property
+	def migrations(self):
+		return self.fleet.migrations[self.index]
+
+	@property
+	def pm_id(self):
+		return self.fleet.hosts[self.index]
+
 	def compute_volume_sandpiper(self, pm):
-		epsilon = 0.001
-		saturated_diff_cpu = (pm.get_cores() - self.load_nominal)
-		saturated_diff_cpu = max(saturated_diff_cpu, epsilon)
-		saturated_diff_mem = (pm.get_memory() - self.memory_nominal)
-		saturated_diff_mem = max(saturated_diff_mem, epsilon)
-		self.volume_nominal_sandpiper = \
-		  pm.get_cores() / saturated_diff_cpu * \
-		  pm.get_memory() / saturated_diff_mem
+		self.fleet.compute_volume_sandpiper(self.index, pm.get_cores(), pm.get_memory())
 
 	def execute(self):
 		#self.load_actual = random.uniform(0.5*self.load_nominal, self.load_nominal)
-		self.load_actual = max(random.gauss(0.75*self.load_nominal, math.sqrt(0.25)),1e-2)
-		self.memory_actual = self.memory_nominal
-		self.volume_actual = self.load_actual * self.memory_actual
+		if self.fleet.streams is None:
+			print("[VM]: A standalone virtual machine needs an index to draw its load")
+			exit(-1)
+		self.fleet.execute_vm(self.index)
 
 	def get_actual_load(self):
 		return self.load_actual
@@ -48,14 +79,13 @@ class VirtualMachine:
 		return self.memory_nominal
 
 	def perform_migration(self, pm_destination):
-		self.compute_volume_sandpiper(pm_destination)
-		self.migrations += 1
+		self.fleet.perform_migration(self.index, pm_destination.get_cores(), pm_destination.get_memory())
 
 	def get_migrations(self):
 		return self.migrations
 
 	def place_on_pm(self, pm):
-		self.pm_id = pm
+		self.fleet.hosts[self.index] = pm
 
 	def get_pm(self):
 		return self.pm_id
@@ -0,0 +1,173 @@
+import numpy as np
+import mmap
+import os
+import struct
+
+# Raw workload trace: a fixed size index header followed by float32 samples
+# in step-major order, one record of num_series x num_vms values per step.
+#   magic (8 bytes), num_steps, num_vms, num_series (uint64),
+#   num_series series names (16 bytes each, zero padded)
+# The samples start at data_offset, a page boundary, so every step is a
+# contiguous slice of the mapped file.
+magic = b'VMLOAD01'
+data_offset = 4096
+name_size = 16
+series_names = ('load', 'memory')
+
+def open_workload(kind, fleet, path=None, offset=0):
+	if kind == 'synthetic':
+		return SyntheticWorkload(fleet)
+	elif kind == 'trace':
+		if path is None:
+			print("[Workload]: A trace workload needs a trace file")
+			exit(-1)
+		return TraceWorkload(fleet, path, offset)
+	print("[Workload]: Unsupported workload %s"%kind)
+	exit(-1)
+
+class SyntheticWorkload:
+	# normal loads around 0.75 of the nominal load, from the fleet load streams
+	num_steps = None
+
+	def __init__(self, fleet):
+		self.fleet = fleet
+
+	def execute(self, step):
+		self.fleet.execute()
+
+	def block(self, step, count):
+		# loads of steps step .. step+count-1, one row per step
+		return self.fleet.load_block(count)
+
+	def commit(self, step, count, load):
+		# the steps of a block were run, load being the last row
+		self.fleet.skip(count, load)
+
+class TraceWorkload:
+	# Replays recorded actual loads (and optionally memories) from a
+	# memory-mapped trace: a raw trace (see write_header) or a (steps, vms)
+	# .npy array of loads, such as the VMloads.npy series of a run. Column i
+	# of the trace drives vm i of the fleet; step t of the simulation reads
+	# trace step offset + t. The fleet arrays are pointed at the mapped rows,
+	# nothing is copied but the volumes.
+
+	def __init__(self, fleet, path, offset=0):
+		self.fleet = fleet
+		self.path = path
+		self.offset = offset
+		self.load, self.memory = map_trace(path)
+		self.num_steps = self.load.shape[0] - offset
+		if self.load.shape[1] < len(fleet):
+			print("[Workload]: The trace has %d virtual machines, the fleet %d"% \
+				(self.load.shape[1], len(fleet)))
+			exit(-1)
+		if self.num_steps < 0:
+			print("[Workload]: Offset %d is past the end of the trace"%offset)
+			exit(-1)
+
+	def execute(self, step):
+		row = self.offset + step
+		assign(self.fleet, self.load[row], None if self.memory is None else self.memory[row])
+
+	def block(self, step, count):
+		row = self.offset + step
+		return self.load[row:row+count, 0:len(self.fleet)]
+
+	def commit(self, step, count, load):
+		self.execute(step + count - 1)
+
+def map_trace(path):
+	# (steps, vms) load and memory (None if absent) arrays mapped from a
+	# trace; the mapping stays valid once the file is closed
+	with open(path, 'rb') as f:
+		mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		if hasattr(mapping, 'madvise'):
+			mapping.madvise(mmap.MADV_SEQUENTIAL)
+		if path.endswith('.npy'):
+			return map_npy(f, path, mapping)
+		return map_raw(path, mapping)
+
+def map_raw(path, mapping):
+	header = mapping[0:32]
+	if header[0:8] != magic:
+		print("[Workload]: %s is not a workload trace"%path)
+		exit(-1)
+	num_steps, num_vms, num_series = struct.unpack('<QQQ', header[8:32])
+	names = list()
+	for i in range(0, num_series):
+		start = 32 + i * name_size
+		names.append(mapping[start:start+name_size].rstrip(b'\0').decode('ascii'))
+	data = np.frombuffer(mapping, dtype='<f4', count=num_steps*num_series*num_vms, \
+		offset=data_offset).reshape(num_steps, num_series, num_vms)
+	if 'load' not in names:
+		print("[Workload]: %s has no load series"%path)
+		exit(-1)
+	load = data[:, names.index('load'), :]
+	memory = data[:, names.index('memory'), :] if 'memory' in names else None
+	return load, memory
+
+def map_npy(f, path, mapping):
+	f.seek(0)
+	version = np.lib.format.read_magic(f)
+	if version == (1, 0):
+		shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+	else:
+		shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+	if fortran_order or len(shape) != 2:
+		print("[Workload]: %s is not a (steps, vms) array"%path)
+		exit(-1)
+	load = np.frombuffer(mapping, dtype=dtype, count=shape[0]*shape[1], \
+		offset=f.tell()).reshape(shape)
+	return load, None
+
+def assign(fleet, load, memory=None):
+	# actual loads (and memories) of one step, rows of a trace or of a sample;
+	# the fleet arrays point at them, only the volumes are computed
+	fleet.load_actual = load[0:len(fleet)]
+	if memory is not None:
+		fleet.memory_actual = memory[0:len(fleet)]
+	else:
+		fleet.memory_actual[:] = fleet.memory_nominal
+	np.multiply(fleet.load_actual, fleet.memory_actual, out=fleet.volume_actual)
+
+def write_header(f, num_steps, num_vms, names):
+	f.seek(0)
+	f.write(magic)
+	f.write(struct.pack('<QQQ', num_steps, num_vms, len(names)))
+	for name in names:
+		f.write(name.encode('ascii').ljust(name_size, b'\0'))
+	f.seek(0, os.SEEK_END)
+
+def import_csv(output, load_csv, memory_csv=None, chunk_rows=4096):
+	# One-time conversion of csv series to a raw trace. Every csv line is a
+	# step with one comma separated value per vm, the layout of the VMloads
+	# series of a run. Loads are clipped at 1e-2 like the synthetic ones.
+	names = ('load',) if memory_csv is None else series_names
+	inputs = [open(load_csv)]
+	if memory_csv is not None:
+		inputs.append(open(memory_csv))
+	num_steps = 0
+	num_vms = None
+	with open(output, 'wb') as f:
+		write_header(f, 0, 0, names)
+		f.write(b'\0' * (data_offset - f.tell()))
+		while True:
+			chunks = list()
+			for source in inputs:
+				lines = [x for x in (source.readline() for i in range(0, chunk_rows)) if x.strip()]
+				chunks.append(np.array([x.split(',') for x in lines], dtype=np.float32))
+			rows = len(chunks[0])
+			if rows == 0:
+				break
+			for chunk in chunks:
+				if len(chunk) != rows or (num_vms is not None and chunk.shape[1] != num_vms):
+					print("[Workload]: The csv series do not have the same shape")
+					exit(-1)
+			num_vms = chunks[0].shape[1]
+			np.maximum(chunks[0], 1e-2, out=chunks[0])
+			f.write(np.stack(chunks, axis=1).tobytes())
+			num_steps += rows
+		write_header(f, num_steps, num_vms or 0, names)
+	for source in inputs:
+		source.close()
+	return num_steps, num_vms
@@ -1,16 +1,6 @@
 #!/bin/bash
 
-echo "[RUN] Running random"
-python Simulation_large.py --strategy random --normalizationperiod 0  --outdir result_random_normperiod0 --steps 10000 
-
-echo "[RUN] Running load_aware"
-python Simulation_large.py --strategy load_aware --normalizationperiod 0   --outdir result_loadaware_normperiod0 --steps 10000 
-python Simulation_large.py --strategy load_aware --normalizationperiod 5   --outdir result_loadaware_normperiod5 --steps 10000
-
-echo "[RUN] Running migration_likelihood"
-python Simulation_large.py --strategy migration_likelihood --normalizationperiod 5   --outdir result_migrationlikelihood_normperiod5 --steps 10000
-
-echo "[RUN] Running sandpiper"
-python Simulation_large.py --strategy sandpiper --normalizationperiod 0  --outdir sandpiper0 --steps 10000
+echo "[RUN] Running random, load_aware, migration_likelihood and sandpiper"
+python Sweep.py --scenario large --strategy random load_aware migration_likelihood sandpiper --normalizationperiod 0 5 --outdir results_sweep_large --steps 10000
 
 rm -rf libs/*.pyc
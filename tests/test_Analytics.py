@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+import Simulation
+import libs.Analytics as Analytics
+
+def test_series_formats_agree(tmp_path):
+	for trace in ('csv', 'npy'):
+		Simulation.run(str(tmp_path / trace), 'large', 'load_aware', steps=80, \
+			trace_format=trace, trace_series='PMloads,MMmigrations')
+	csv, npy = Analytics.analyze(str(tmp_path / 'csv'), 16), Analytics.analyze(str(tmp_path / 'npy'))
+	assert csv == dict(npy, run='csv')
+	with open(str(tmp_path / 'csv' / 'summary.json')) as f:
+		assert csv['overload_time'] == json.load(f)['overload_time']
+
+def test_missing_migrations_fail(tmp_path, capsys):
+	# without MMmigrations the run would look like one without migrations
+	Simulation.run(str(tmp_path), 'large', 'load_aware', steps=20, trace_series='PMloads')
+	with pytest.raises(SystemExit):
+		Analytics.analyze(str(tmp_path))
+	assert 'no MMmigrations series' in capsys.readouterr().out
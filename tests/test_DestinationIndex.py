@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import libs.DestinationIndex as DestinationIndex
+
+def brute_best(keys, sign, exclude, limit):
+	best = None
+	for pm in range(0, len(keys)):
+		if pm == exclude or np.isnan(keys[pm]):
+			continue
+		if best is None or sign * keys[pm] < sign * keys[best]:
+			best = pm
+	if best is not None and limit is not None and sign * keys[best] > sign * limit:
+		return None
+	return best
+
+@pytest.mark.parametrize('order', ['min', 'max'])
+def test_queries_match_brute_force(order):
+	# scans before the sort, the sorted order after it, and stale updates
+	random = np.random.default_rng(7)
+	sign = 1.0 if order == 'min' else -1.0
+	for trial in range(0, 300):
+		num_pms = int(random.integers(1, 12))
+		keys = random.integers(0, 5, size=num_pms).astype(float)
+		keys[random.random(num_pms) < 0.1] = np.nan
+		index = DestinationIndex.DestinationIndex(keys, order)
+		for query in range(0, 2 * DestinationIndex.DestinationIndex.sort_after + 4):
+			if random.random() < 0.5:
+				pm = int(random.integers(num_pms))
+				keys[pm] = float(random.integers(0, 5))
+				index.update(pm, keys[pm])
+			exclude = int(random.integers(num_pms)) if random.random() < 0.7 else None
+			limit = float(random.integers(0, 5)) if random.random() < 0.3 else None
+			assert index.best(exclude=exclude, limit=limit) == brute_best(keys, sign, exclude, limit)
+
+def test_sorts_only_after_repeated_queries():
+	index = DestinationIndex.DestinationIndex(np.arange(100.0), 'min')
+	for query in range(1, DestinationIndex.DestinationIndex.sort_after):
+		assert index.best(exclude=0) == 1
+		assert index.order is None
+	index.best()
+	assert index.order is not None
+	index.refresh(np.arange(100.0)[::-1])
+	assert index.order is None
+	assert index.best() == 99
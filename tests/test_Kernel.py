@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+import Simulation
+
+@pytest.mark.parametrize('scenario', ['small', 'large'])
+@pytest.mark.parametrize('strategy,normalization_period', [('random', 0), ('load_aware', 5), \
+	('load_aware_woi', 0), ('migration_likelihood_woi', 5), ('sandpiper', 0), ('sandpiper', 5)])
+def test_event_kernel_matches_step_kernel(tmp_path, scenario, strategy, normalization_period):
+	# the event kernel only advances quiescent steps in blocks: every series
+	# has to be byte for byte the one of the step kernel
+	outdirs = dict()
+	for kernel in ('step', 'event'):
+		outdirs[kernel] = str(tmp_path / kernel)
+		Simulation.run(outdirs[kernel], scenario, strategy, normalization_period=normalization_period, \
+			steps=300, kernel=kernel, block_steps=16)
+	names = sorted(os.listdir(outdirs['step']))
+	assert names == sorted(os.listdir(outdirs['event']))
+	for name in names:
+		if name == 'summary.json':
+			continue
+		with open(os.path.join(outdirs['step'], name), 'rb') as f, \
+			open(os.path.join(outdirs['event'], name), 'rb') as g:
+			assert f.read() == g.read(), name
+	summaries = list()
+	for kernel in ('step', 'event'):
+		with open(os.path.join(outdirs[kernel], 'summary.json')) as f:
+			summaries.append(dict(json.load(f), elapsed=None))
+	assert summaries[0] == summaries[1]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import libs.LoadAware as LoadAware
+import libs.DestinationIndex as DestinationIndex
+import libs.MigrationManager as MigrationManager
+import libs.Scenario as Scenario
+import libs.Trace as Trace
+
+def matrix_pair(source, vms, vm_volumes, available_volume_per_pm):
+	# the num_vms x num_pms scoring matrix that best_pair replaced
+	num_vms = len(vm_volumes)
+	num_pms = len(available_volume_per_pm)
+	aware_matrix = np.zeros((num_vms, num_pms))
+	for col in range(0, num_pms):
+		aware_matrix[:, col] = available_volume_per_pm[col]
+	for row in range(0, num_vms):
+		if row in vms:
+			vol_to_remove = vm_volumes[row]
+		else:
+			vol_to_remove = np.inf
+		aware_matrix[row, :] = aware_matrix[row, :] - vol_to_remove
+	aware_matrix[:, source] = np.nan
+	aware_matrix[aware_matrix < 0] = np.nan
+	if np.isnan(aware_matrix).all():
+		return None
+	vm, destination = np.unravel_index(np.nanargmax(aware_matrix), (num_vms, num_pms))
+	return int(vm), int(destination)
+
+def as_ints(decision):
+	return None if decision is None else (int(decision[0]), int(decision[1]))
+
+@pytest.mark.parametrize('scenario', ['small', 'large'])
+@pytest.mark.parametrize('strategy', ['load_aware', 'load_aware_woi'])
+def test_decisions_match_matrix(scenario, strategy, monkeypatch):
+	# every decision of a seeded run, step by step, against the matrix
+	physical_machines, fleet, hosts = Scenario.build(Scenario.load(scenario), 100)
+	manager = MigrationManager.MigrationManager(None, strategy, physical_machines, fleet, 0, \
+		trace=Trace.CSVTraceSink(None, ()), initial_placement=hosts)
+	best_pair = LoadAware.best_pair
+	decisions = list()
+	def checked(source, vms, vm_volumes, free_volume_index):
+		decision = as_ints(best_pair(source, vms, vm_volumes, free_volume_index))
+		expected = matrix_pair(source, vms.tolist(), vm_volumes, free_volume_index.keys)
+		assert decision == expected, 'step %d'%manager.time_index
+		decisions.append(decision)
+		return decision
+	monkeypatch.setattr(LoadAware, 'best_pair', checked)
+	for i in range(0, 200):
+		fleet.execute()
+		manager.execute(i)
+	assert any(x is not None for x in decisions)
+
+def test_ties_and_infeasible_match_matrix():
+	random = np.random.default_rng(4)
+	for trial in range(0, 2000):
+		num_pms = int(random.integers(2, 7))
+		num_vms = int(random.integers(1, 9))
+		# few distinct values, so that ties and misfits are frequent
+		vm_volumes = random.integers(0, 4, size=num_vms).astype(float)
+		available = random.integers(-1, 5, size=num_pms).astype(float)
+		source = int(random.integers(num_pms))
+		vms = np.flatnonzero(random.random(num_vms) < 0.6)
+		index = DestinationIndex.DestinationIndex(available, 'max')
+		assert as_ints(LoadAware.best_pair(source, vms, vm_volumes, index)) == \
+			matrix_pair(source, vms.tolist(), vm_volumes, available)
@@ -0,0 +1,15 @@
+import pytest
+
+import Simulation
+
+@pytest.mark.parametrize('strategy', ['random', 'sandpiper', 'load_aware_woi', 'migration_likelihood'])
+def test_replicas_match_serial_runs(tmp_path, strategy):
+	# replica r of a batch evolves like a serial run of replica r
+	Simulation.run_replicas(str(tmp_path / 'batch'), 3, 'large', strategy=strategy, steps=120)
+	with open(str(tmp_path / 'batch' / 'replicas.csv')) as f:
+		rows = [x.strip().split(', ') for x in f.readlines()[1:]]
+	for replica, total_migrations, overload_time, steps in rows:
+		summary = Simulation.run(str(tmp_path / replica), 'large', strategy, steps=120, \
+			replica=int(replica), trace_series='none')
+		assert [summary['total_migrations'], summary['overload_time']] == \
+			[int(total_migrations), int(overload_time)]
@@ -0,0 +1,31 @@
+import multiprocessing
+import os
+
+import pytest
+
+import Simulation
+import libs.Sharding as Sharding
+
+def shared_segments():
+	return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', \
+	reason='the failure is patched into the forked workers')
+def test_failed_shard_stops_the_run(tmp_path, monkeypatch, capsys):
+	run = Sharding.Shard.run
+	def failing_run(self, first_step, last_step):
+		if self.index == 1 and last_step >= 20:
+			raise ValueError('broken shard')
+		return run(self, first_step, last_step)
+	monkeypatch.setattr(Sharding.Shard, 'run', failing_run)
+	before = shared_segments()
+	with pytest.raises(SystemExit):
+		Simulation.run_sharded(str(tmp_path), 2, 'large', steps=50, trace_series='none')
+	assert "Shard 1 failed on run: ValueError('broken shard')" in capsys.readouterr().out
+	assert multiprocessing.active_children() == []
+	assert shared_segments() == before
+
+def test_sharded_run_completes(tmp_path):
+	summary = Simulation.run_sharded(str(tmp_path), 2, 'large', steps=50, trace_series='none')
+	assert summary['steps'] == 50 and len(summary['shards']) == 2
+	assert multiprocessing.active_children() == []
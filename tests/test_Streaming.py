@@ -0,0 +1,15 @@
+import numpy as np
+
+import Simulation
+import libs.Streaming as Streaming
+import libs.Trace as Trace
+import libs.MigrationManager as MigrationManager
+
+def test_worker_thread_ignores_float_errors():
+	# the manager divides by the load of empty pms, in the worker thread
+	physical_machines, fleet, hosts = Simulation.build('large')
+	manager = MigrationManager.MigrationManager(None, 'load_aware_woi', physical_machines, \
+		fleet, 0, trace=Trace.CSVTraceSink(None, ()), initial_placement=hosts)
+	controller = Streaming.Controller(manager)
+	assert controller.executor.submit(np.geterr).result()['divide'] == 'ignore'
+	controller.executor.shutdown()
@@ -0,0 +1,25 @@
+import numpy as np
+
+import libs.Trace as Trace
+
+def test_npy_chunks_hold_a_byte_budget(tmp_path):
+	sink = Trace.NpyTraceSink(str(tmp_path), ('VMloads', 'MMmigrations'), chunk_bytes=4096)
+	rows = np.random.default_rng(1).random((50, 100))
+	for i, row in enumerate(rows):
+		sink.record('VMloads', row)
+		sink.event('MMmigrations', (i + 1, i, 3, 0, 1))
+		# 4096 bytes are 5 rows of 100 float64
+		assert sink.buffers['VMloads'].shape[0] == 5
+		if i == 20:
+			# a flushed file reads back while the run goes on
+			sink.flush()
+			assert np.array_equal(np.load(str(tmp_path / 'VMloads.npy')), rows[0:21])
+	sink.close()
+	assert np.array_equal(np.load(str(tmp_path / 'VMloads.npy')), rows)
+	assert np.load(str(tmp_path / 'MMmigrations.npy'))[-1].tolist() == [50, 49, 3, 0, 1]
+
+def test_wide_rows_buffer_one_row(tmp_path):
+	sink = Trace.NpyTraceSink(str(tmp_path), ('VMloads',), chunk_bytes=64)
+	sink.record('VMloads', np.ones(1000))
+	assert sink.buffers['VMloads'].shape == (1, 1000)
+	sink.close()
@@ -0,0 +1,20 @@
+import os
+
+import Simulation
+import Tune
+import libs.Checkpoint as Checkpoint
+
+def test_rungs_resume_from_their_last_step(tmp_path):
+	config = dict(scenario='large', strategy='load_aware_woi', trace_series='none')
+	straight = Simulation.run(str(tmp_path / 'straight'), steps=150, **config)
+	outdir = str(tmp_path / 'rungs')
+	for steps, resume in ((50, False), (100, True), (150, True)):
+		summary = Tune.run_rung((config, outdir, steps, steps < 150, resume))[2]
+	# the checkpoint of the end of the second rung, not saved again by the last one
+	assert Checkpoint.load(os.path.join(outdir, 'checkpoint.npz'))[1]['step'] == 99
+	assert [summary[x] for x in Tune.objectives] == [straight[x] for x in Tune.objectives]
+
+def test_failed_rung_is_reported(tmp_path):
+	# no checkpoint to resume from: the run fails, the worker survives
+	summary = Tune.run_rung((dict(scenario='large'), str(tmp_path), 50, True, True))[2]
+	assert 'error' in summary
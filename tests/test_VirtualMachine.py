@@ -0,0 +1,43 @@
+import pytest
+
+import libs.MigrationManager as MigrationManager
+import libs.PhysicalMachine as PhysicalMachine
+import libs.Trace as Trace
+import libs.VMFleet as VMFleet
+import libs.VirtualMachine as VirtualMachine
+
+def manager_loads(seed, replica):
+	pms = [PhysicalMachine.PhysicalMachine() for i in range(0, 3)]
+	vms = [VirtualMachine.VirtualMachine(pms[0]) for i in range(0, 6)]
+	MigrationManager.MigrationManager(None, 'random', pms, vms, 0, \
+		trace=Trace.CSVTraceSink(None, ()), seed=seed, replica=replica)
+	for vm in vms:
+		vm.execute()
+	return [vm.get_actual_load() for vm in vms]
+
+def test_manager_streams_follow_its_seed():
+	for seed, replica in ((7, 0), (7, 2), (100, 0)):
+		fleet = VMFleet.VMFleet([4.0] * 6, [1.0] * 6, ['basic'] * 6, seed=seed, replica=replica)
+		fleet.execute()
+		assert manager_loads(seed, replica) == fleet.load_actual.tolist()
+	assert manager_loads(7, 0) != manager_loads(100, 0)
+
+def test_standalone_streams_ignore_build_order():
+	pm = PhysicalMachine.PhysicalMachine()
+	first = VirtualMachine.VirtualMachine(pm, index=4, seed=7)
+	for i in range(0, 5):
+		VirtualMachine.VirtualMachine(pm, index=i, seed=7)
+	later = VirtualMachine.VirtualMachine(pm, index=4, seed=7)
+	first.execute()
+	later.execute()
+	assert first.get_actual_load() == later.get_actual_load()
+	# vm 4 of a fleet of the same seed
+	fleet = VMFleet.VMFleet([4.0] * 5, [1.0] * 5, ['basic'] * 5, seed=7)
+	fleet.execute()
+	assert later.get_actual_load() == fleet.load_actual[4]
+
+def test_unindexed_standalone_vm_has_no_stream(capsys):
+	vm = VirtualMachine.VirtualMachine(PhysicalMachine.PhysicalMachine())
+	with pytest.raises(SystemExit):
+		vm.execute()
+	assert 'needs an index' in capsys.readouterr().out